@@ -53,71 +53,59 @@ import time
 import numpy as np
 from common import parse_args, read_rows
 
-# Directions: (dy,dx) up, right, down, left
-DIRECTIONS = [(-1, 0), (0, 1), (1, 0), (0, -1)]
-
-def trailhead_destinations(chart, y0, x0):
-    """
-    Calculate the destinations (locations with value 9) that can be reached from a starting point
-    'y0, x0' on `chart`.
-    """
-    h,w = chart.shape
-    v = chart[y0, x0]
-    if v == 9:
-        return {(y0, x0)}
-    destinations = set()
-    for dy, dx in DIRECTIONS:
-        y, x = y0 + dy, x0 + dx
-        if 0 <= y < h and 0 <= x < w and chart[y, x] == v + 1:
-            s = trailhead_destinations(chart, y, x)
-            destinations.update(s)
-    return destinations
-
-def complete_trails(chart, y0, x0):
-    """ Returns all complete trails that can be reached from a starting point
-        'y0, x0' on `chart`.
-        A complete trail is a sequence of points that has a length of 18 (9*2) and chart[y,x] == i
-        for i in 0..9.
-        i.e. trail = [(y0, x0), (y1, x1), ... (y9, x9)] where chart[y0, x0] == 0 and chart[y9, x9] == 9.
+# Layer dynamic programming.
+# Trails climb one height per step, so every trail to a cell of height h continues from a neighbour
+# of height h + 1. Starting from the summits at height 9, each layer h is the neighbour sum (or
+# neighbour union) of layer h + 1, masked by chart == h. Ten vectorised steps solve the whole chart.
+
+SUMMIT = 9
+SUMMIT_BLOCK = 64 * 8  # Summits whose reachability is tracked at once, as bits of uint64 words.
+
+def neighbour_combine_(values, combine):
+    "Returns `combine` of the up, right, down and left neighbours of each cell, 0 outside the chart."
+    total = np.zeros_like(values)
+    combine(total[1:], values[:-1], out=total[1:])
+    combine(total[:-1], values[1:], out=total[:-1])
+    combine(total[:, 1:], values[:, :-1], out=total[:, 1:])
+    combine(total[:, :-1], values[:, 1:], out=total[:, :-1])
+    return total
+
+def trail_counts_(chart):
+    "Returns the number of trails from each cell of `chart` to a summit, 0 for cells not on a trail."
+    counts = (chart == SUMMIT).astype(np.int64)
+    for h in range(SUMMIT - 1, -1, -1):
+        counts = np.where(chart == h, neighbour_combine_(counts, np.add), 0)
+    return counts
+
+def summit_scores_(chart):
+    """ Returns the number of summits reachable from each cell of `chart`.
+        The summits are taken in blocks of SUMMIT_BLOCK and reach[y, x] is a bitset of the summits
+        in a block that are reachable from y, x, packed into uint64 words. A trail is only SUMMIT
+        steps long, so each block is solved in the window of the chart within SUMMIT cells of its
+        summits, which bounds the time and memory for charts with many summits.
     """
-    h,w = chart.shape
-    v = chart[y0, x0]
-    step = (y0, x0)
-    if v == 9:
-        return {(step)}
-    trails = set()
-    for dy, dx in DIRECTIONS:
-        y, x = y0 + dy, x0 + dx
-        if 0 <= y < h and 0 <= x < w and chart[y, x] == v + 1:
-            plist = complete_trails(chart, y, x)
-            for p in plist:
-                if len(p) == 2*(9-v):
-                    q = list(reversed(p))
-                    q.extend(list(reversed(step)))
-                    q.reverse()
-                    trails.add(tuple(q))
-    return trails
+    summits = np.argwhere(chart == SUMMIT)
+    scores = np.zeros(chart.shape, dtype=np.int64)
+    for b in range(0, len(summits), SUMMIT_BLOCK):
+        block = summits[b:b + SUMMIT_BLOCK]
+        (y0, x0), (y1, x1) = np.maximum(block.min(axis=0) - SUMMIT, 0), block.max(axis=0) + SUMMIT + 1
+        window = chart[y0:y1, x0:x1]
+        bits = np.arange(len(block))
+        reach = np.zeros(window.shape + ((len(block) + 63) // 64,), dtype=np.uint64)
+        reach[block[:, 0] - y0, block[:, 1] - x0, bits // 64] = np.left_shift(np.uint64(1), (bits % 64).astype(np.uint64))
+        for h in range(SUMMIT - 1, -1, -1):
+            reach = np.where((window == h)[..., None], neighbour_combine_(reach, np.bitwise_or), np.uint64(0))
+        scores[y0:y1, x0:x1] += np.unpackbits(reach.view(np.uint8), axis=2).sum(axis=2, dtype=np.int64)
+    return scores
 
 def part1(chart):
     "Solution to part 1. 36 for the test input. (557)"
-    w, h = len(chart[0]), len(chart)
-    total = 0
-    for y in range(h):
-        for x in range(w):
-            if chart[y][x] == 0:
-                score = trailhead_destinations(chart, y, x)
-                total += len(score)
+    total = int(summit_scores_(chart)[chart == 0].sum())
     print(f"Part 1: {total}")
 
 def part2(chart):
     "Solution to part 2. 81 for the test input. (1062)"
-    w, h = len(chart[0]), len(chart)
-    total = 0
-    for y in range(h):
-        for x in range(w):
-            if chart[y][x] == 0:
-                trails = complete_trails(chart, y, x)
-                total += len(trails)
+    total = int(trail_counts_(chart)[chart == 0].sum())
     print(f"Part 2: {total}")
 
 args = parse_args("Advent of Code 2024 - Day 10", "problems/aoc2024-day10-input-test.txt")
@@ -243,6 +243,88 @@ def is_tree(w, h, posvels):
             if np.all(img[y:y+3, x:x+3]): return True
     return False
 
+# Batched frame evaluation.
+# A frame is the robots' positions at one time step. A batch of T frames is a (T, robots) array of
+# flat cell indices y * w + x, so metrics can be computed for every frame in a batch with a few
+# NumPy operations rather than a Python loop per second.
+
+MEMORY_BUDGET = 64 * 1024 * 1024   # Bytes of working memory for a batch of frames.
+BLOCK_SIZE = 3                     # The side of the square blocks used by `block_clustering`.
+
+def robot_arrays_(lines):
+    "Returns `pos`, `vel`: (robots, 2) int64 arrays of the (x, y) positions and velocities in `lines`."
+    robots = [robots_(line) for line in lines]
+    pos = np.array([(pv.pos.x, pv.pos.y) for pv in robots], dtype=np.int64)
+    vel = np.array([(pv.vel.x, pv.vel.y) for pv in robots], dtype=np.int64)
+    return pos, vel
+
+def frames_(pos, vel, w, h, t0, T):
+    "Returns a (T, robots) array of the flat cell indices of the robots at times t0, ... t0+T-1."
+    t = np.arange(t0, t0 + T, dtype=np.int64)[:, None]
+    x = (pos[:, 0] + t * vel[:, 0]) % w
+    y = (pos[:, 1] + t * vel[:, 1]) % h
+    return y * w + x
+
+def frame_counts_(cells, num_cells):
+    """Returns a (T, num_cells) array of the number of robots in each cell for each frame.
+        `cells` is a (T, robots) array of cell indices in [0, num_cells).
+        A single `np.bincount` counts all frames by offsetting each frame's cells by frame * num_cells.
+    """
+    T = cells.shape[0]
+    offsets = np.arange(T, dtype=np.int64)[:, None] * num_cells
+    counts = np.bincount((cells + offsets).ravel(), minlength=T * num_cells)
+    return counts.reshape(T, num_cells)
+
+def block_counts_(cells, w, h):
+    "Returns a (T, blocks) array of the number of robots in each BLOCK_SIZE x BLOCK_SIZE block for each frame."
+    bw, bh = -(-w // BLOCK_SIZE), -(-h // BLOCK_SIZE)
+    y, x = np.divmod(cells, w)
+    blocks = (y // BLOCK_SIZE) * bw + x // BLOCK_SIZE
+    return frame_counts_(blocks, bw * bh)
+
+def block_clustering(cells, w, h):
+    "Metric: Returns the sum of the squares of the number of robots in each block for each frame."
+    counts = block_counts_(cells, w, h)
+    return (counts * counts).sum(axis=1)
+
+def batch_size_(num_robots, num_cells, memory_budget=MEMORY_BUDGET):
+    """Returns the number of frames that can be evaluated in one batch within `memory_budget` bytes.
+        Each frame needs about 4 int64 arrays of `num_robots` and one int64 array of `num_cells`.
+    """
+    frame_bytes = 8 * (4 * num_robots + num_cells)
+    return max(1, memory_budget // frame_bytes)
+
+def scan_frames(pos, vel, w, h, metric, batch_size=None, num_frames=None):
+    """Returns a (num_frames,) array of `metric` evaluated on the robot frames at times 0, 1, ...
+        `metric(cells, w, h)` takes a (T, robots) array of cell indices and returns a (T,) array.
+        `batch_size` is the number of frames evaluated at once (default: fits in MEMORY_BUDGET).
+        `num_frames` defaults to w * h, which covers the full period of the robots.
+    """
+    if num_frames is None: num_frames = w * h
+    if batch_size is None: batch_size = batch_size_(len(pos), w * h)
+    values = []
+    for t0 in range(0, num_frames, batch_size):
+        T = min(batch_size, num_frames - t0)
+        values.append(metric(frames_(pos, vel, w, h, t0, T), w, h))
+    return np.concatenate(values)
+
+def test_frames_():
+    "Test the batched frames against moving the test robots one second at a time."
+    lines = read_lines("problems/aoc2024-day14-input-test.txt")
+    w, h = 11, 7
+    pos, vel = robot_arrays_(lines)
+    robots = [robots_(line) for line in lines]
+    num_frames = w * h
+    frames = frames_(pos, vel, w, h, 0, num_frames)
+    for t in range(num_frames):
+        expected = [pv.pos.y * w + pv.pos.x for pv in robots]
+        assert frames[t].tolist() == expected, f"t={t}: Expected {expected}, got {frames[t].tolist()}"
+        move(robots, w, h)
+    expected = block_clustering(frames, w, h)
+    clustering = scan_frames(pos, vel, w, h, block_clustering, batch_size=10)
+    assert np.array_equal(clustering, expected), "Batched clustering differs"
+    print(f"Test passed: {num_frames} frames of {len(robots)} robots")
+
 def part1(w, h, lines, VERBOSE):
     "Solution to part 1. 12 for the test input. (230900224)"
     NUM_SECS = 100
@@ -305,9 +387,22 @@ def part2(w, h, lines, VERBOSE):
         if tree_i < 0: tree_i = i
     print(f"Part 2: {tree_i}")
 
+def part2_batched(w, h, lines, VERBOSE):
+    "Solution to part 2 that scans the full w x h period of the robots in batches of frames. (6532)"
+    pos, vel = robot_arrays_(lines)
+    batch_size = batch_size_(len(pos), w * h)
+    print(f"{len(pos)} robots {w}x{h} scanning {w * h} frames in batches of {batch_size}")
+    clustering = scan_frames(pos, vel, w, h, block_clustering, batch_size)
+    tree_i = int(np.argmax(clustering))
+    if VERBOSE:
+        order = np.argsort(clustering)[::-1]
+        for i in order[:5]: print(f"{i:6}: {clustering[i]}")
+    print(f"Part 2: {tree_i}")
+
 args = parse_args("Advent of Code 2024 - Day 13", "problems/aoc2024-day14-input-test.txt")
 if args.testing:
     test_robots_()
+    test_frames_()
     exit(0)
 
 lines = read_lines(args.input)
@@ -319,7 +414,10 @@ t0 = time.time()
 part1(w, h, lines, args.verbose)
 t1 = time.time() - t0
 t0 = time.time()
-part2(w, h, lines, args.verbose)
+if args.optimise:
+    part2_batched(w, h, lines, args.verbose)
+else:
+    part2(w, h, lines, args.verbose)
 t2 = time.time() - t0
 print(f"Part 1: {t1:.1f} sec")
 print(f"Part 2: {t2:.1f} sec")
@@ -441,18 +441,21 @@
     all boxes' final GPS coordinates?
 """
 import time
+import hashlib
+import zlib
+from itertools import dropwhile, islice, takewhile
 import numpy as np
-from common import read_lines, parse_args
+from common import read_lines, parse_args, MyNamespace as ns
 
 SPACE = 0
 WALL = 1
 BOX_BASE = 32
-BOXsingle, BOXleft, BOXright = BOX_BASE + 0, BOX_BASE + 1, BOX_BASE + 2
+BOXsingle, BOXleft, BOXright, BOXmiddle = BOX_BASE + 0, BOX_BASE + 1, BOX_BASE + 2, BOX_BASE + 3
 ROBOT = 3
 
 SPACE_SYMBOL = "."
 WALL_SYMBOL = "#"
-BOX_SYMBOLsingle, BOX_SYMBOLleft, BOX_SYMBOLright, = "O", "[", "]"
+BOX_SYMBOLsingle, BOX_SYMBOLleft, BOX_SYMBOLright, BOX_SYMBOLmiddle = "O", "[", "]", "="
 ROBOT_SYMBOL = "@"
 
 SYMBOL_TO_NUMBER_1 = { # !@#$ Remove
@@ -461,6 +464,7 @@ SYMBOL_TO_NUMBER_1 = { # !@#$ Remove
     BOX_SYMBOLsingle: BOXsingle,
     BOX_SYMBOLleft: BOXleft,
     BOX_SYMBOLright: BOXright,
+    BOX_SYMBOLmiddle: BOXmiddle,
     ROBOT_SYMBOL: ROBOT}
 NUMBER_TO_SYMBOL = {v: k for k, v in SYMBOL_TO_NUMBER_1.items()}
 
@@ -470,8 +474,17 @@ SYMBOL_TO_NUMBER = {
     BOX_SYMBOLsingle: BOXsingle,
     BOX_SYMBOLleft: BOXleft,
     BOX_SYMBOLright: BOXright,
+    BOX_SYMBOLmiddle: BOXmiddle,
     ROBOT_SYMBOL: ROBOT}
 
+# Offsets of the other cells of the same box that must move with a box cell. Boxes are horizontal
+# runs of cells [, =, ..., =, ] so boxes of any width are supported.
+BOX_PARTNERS = {
+    BOXsingle: (),
+    BOXleft: (1,),
+    BOXright: (-1,),
+    BOXmiddle: (-1, 1)}
+
 SYMBOL_1TO2 = {
     SPACE_SYMBOL: "..",
     WALL_SYMBOL: "##",
@@ -561,13 +574,6 @@ def robot_position_(warehouse):
     assert len(y) == 1, f"Expected 1 robot, found {len(y)}"
     return (x[0], y[0])
 
-def next_pos_(x, y, move):
-    if move == "^":   return (x, y - 1)
-    elif move == "v": return (x, y + 1)
-    elif move == "<": return (x - 1, y)
-    elif move == ">": return (x + 1, y)
-    else: raise ValueError(f"Unknown direction: {move}")
-
 def sum_box_coordinates(warehouse):
     """Return the sum of the GPS coordinates of all boxes."""
     h, w = warehouse.shape
@@ -575,24 +581,40 @@ def sum_box_coordinates(warehouse):
     result = sum(100*y + x for x, y in boxes)
     return result
 
+KINDS = (WALL, BOXsingle, BOXleft, BOXright, BOXmiddle, ROBOT)
+
 class Warehouse:
     """ The Warehouse class represents a warehouse with a robot and boxes.
-        The warehouse is represented as a 2D numpy array `grid`
-        The robot is represented by the value `robot` which is a tuple (x, y)
+        The warehouse is stored as a flat bytearray `cells` where cell (x, y) is at offset y * w + x.
+        `grid` is a 2D numpy view of `cells`.
+        The robot is represented by `robot` which is its offset in `cells`.
         The `is_part2` flag is True if the warehouse is the part 2 warehouse.
+        The `debug` flag enables full-grid checks of the warehouse invariants after every move.
+        Otherwise the number of cells of each kind is tracked by the incremental counters `counts`
+        and checked once after a sequence of moves.
     """
-    def __init__(self, grid, is_part2):
-        self.grid = grid
+    def __init__(self, grid, is_part2, debug=False):
         self.h, self.w = grid.shape
-        self.robot = robot_position_(grid)
+        self.cells = bytearray(grid.astype(np.uint8).tobytes())
+        self.grid = np.frombuffer(self.cells, dtype=np.uint8).reshape(self.h, self.w)
+        x, y = robot_position_(self.grid)
+        self.robot = int(y) * self.w + int(x)
+        self.deltas = {"^": -self.w, "v": self.w, "<": -1, ">": 1}
         self.is_part2 = is_part2
+        self.debug = debug
+        self.visited = bytearray(self.h * self.w)
+        self.moved = [0] * (self.h * self.w)
+        self.counts = [0] * 256
+        for v in self.cells: self.counts[v] += 1
+        self.counts0 = self.counts.copy()
+        self.snapshots = []
         self.validate()
 
     @classmethod
-    def from_lines(cls, lines, is_part2=False):
+    def from_lines(cls, lines, is_part2=False, debug=False):
         """Create a Warehouse object from a list of strings."""
         grid = lines_to_grid(lines, is_part2)
-        return cls(grid, is_part2)
+        return cls(grid, is_part2, debug)
 
     def __str__(self):
         if not self.is_part2: return grid_to_text1(self.grid)
@@ -607,154 +629,164 @@ class Warehouse:
                 print(self)
                 raise ValueError("Invalid grid")
 
-    def __getitem__(self, key):
-        return self.grid[key]
-
-    def __setitem__(self, key, value):
-        self.grid[key] = value
+    def set_cell(self, i, v):
+        """Set cell `i` to `v` and update the incremental counters."""
+        counts = self.counts
+        counts[self.cells[i]] -= 1
+        counts[v] += 1
+        self.cells[i] = v
 
     def num_kind(self, kind):
         return np.count_nonzero(self.grid == kind)
 
     def num_kinds(self):
-        return {kind: self.num_kind(kind) for kind in (WALL, BOXsingle, BOXleft, BOXright, ROBOT)}
+        return {kind: self.num_kind(kind) for kind in KINDS}
 
     def equal_kinds(self, kinds2):
         return all(self.num_kinds()[kind] == kinds2[kind] for kind in kinds2)
 
-    def move_simple(self, move):
-        """Move the robot in direction `move`."""
-        x, y = self.robot
-        nx, ny = next_pos_(x, y, move)
-        if self[ny, nx] == WALL: return
-        if self[ny, nx] == SPACE:
-            self[y, x] = SPACE
-            self[ny, nx] = ROBOT
-            self.robot = (nx, ny)
-        elif is_box(self[ny, nx]):
-            nnx, nny = nx, ny
-            boxes = []
-            while is_box(self[nny, nnx]):
-                v = self[nny, nnx]
-                nnx, nny = next_pos_(nnx, nny, move)
-                boxes.append((v, (nnx, nny)))
-            if self[nny, nnx] == SPACE:
-                for v, (nnx, nny) in boxes: self[nny, nnx] = v
-                self[y, x] = SPACE
-                self[ny, nx] = ROBOT
-                self.robot = (nx, ny)
-
-    def box_pair_(self, nx, ny):
-        """Return the pair of boxes that (`nx`,`ny`) is half of."""
-        assert is_box(self[ny, nx])
-        on_left = self[ny, nx] == BOXleft
-        if on_left: assert self[ny, nx + 1] == BOXright
-        else:       assert self[ny, nx - 1] == BOXleft
-        if on_left: nnx1, nnx2, nny = nx, nx + 1, ny
-        else:       nnx1, nnx2, nny = nx - 1, nx, ny
-        return [(nnx1, nny), (nnx2, nny)]
-
-    def extend_frontier(self, move, frontier, boxes):
-        """ Extend the frontier of the boxes moving in direction `move`.
-            `frontier` the boxes that are most advanced in the direction of `move`.
-            `boxes` is the set of boxes are being moved.
-            Return new_frontier, new_boxes, hit_wall, is_extended where
-            - hit_wall is True if the robot hit a wall
-            - is_extended is True if the frontier was extended.
-        """
-        new_frontier = []
-        new_boxes = boxes.copy()
-
-        def add_box(nnx, nny):
-            """Add the box at (`nnx`,`nny`) to `new_frontier` and `new_boxes`."""
-            if (nnx, nny) not in boxes:
-                new_frontier.append((nnx, nny))
-                new_boxes.add((nnx, nny))
-
-        is_extended = False
-        for (nx, ny) in frontier:
-            nnx, nny = next_pos_(nx, ny, move)
-            if self[nny, nnx] == WALL:
-                return frontier, boxes, True, False
-            if is_box(self[nny, nnx]):
-                box_pair = self.box_pair_(nnx, nny)
-                for nnx, nny in box_pair: add_box(nnx, nny)
-                is_extended = True
-            else:
-                new_frontier.append((nx, ny))
-        return new_frontier, new_boxes, False, is_extended
-
-    def advanced_boxes_(self, move, nx, ny):
-        """ Find all the boxes that will be moved when the boxs at (`nx`,`ny`) moves by `move`.
-            Return `boxes`, `hit_wall` where
-            - boxes is the set of boxes that will be moved
-            - hit_wall is True if the robot hit a wall
+    def check_counts(self):
+        """Check that the moves so far have not created or destroyed any objects."""
+        kinds0 = {kind: self.counts0[kind] for kind in KINDS}
+        kinds = {kind: self.counts[kind] for kind in KINDS}
+        assert kinds == kinds0, f"Number of objects changed:\n  {kinds0}\n->{kinds}"
+
+    def push_(self, d):
+        """ Move the robot by offset `d`, pushing any boxes in its way.
+            The cells that will move are found by a BFS from the robot over cell offsets. Each cell
+            in the BFS queue pulls in the other cells of its box and pushes the cell at offset `d`
+            from it. `visited` marks the queued cells and `moved` is the BFS queue.
+            The moved cells are then shifted in one pass, starting with the cell furthest in
+            direction `d`, which is the cell with the highest offset if `d` > 0.
+            Return True if the robot moved, False if the push was blocked by a wall.
         """
-        frontier = self.box_pair_(nx, ny)
-        boxes = set(frontier)
-        for _ in range(100):
-            new_frontier, new_boxes, hit_wall, is_extended = self.extend_frontier(move, frontier, boxes)
-            if hit_wall: return boxes, True
-            if not is_extended: return boxes, False
-            frontier = new_frontier
-            boxes = new_boxes
-        raise ValueError("Unreachable")
-
-    def move_box_pairs(self, move):
-        """Move the robot in direction `move` taking into account box pairs."""
-        x, y = self.robot
-        nx, ny = next_pos_(x, y, move)
-        if self[ny, nx] == WALL: return
-        if self[ny, nx] == SPACE:
-            self[y, x] = SPACE
-            self[ny, nx] = ROBOT
-            self.robot = (nx, ny)
-        elif is_box(self[ny, nx]):
-            boxes, hit_wall = self.advanced_boxes_(move, nx, ny)  # List of (x,y) pairs
-            if hit_wall: return
-            box_vals = {(nnx, nny): self[nny, nnx] for nnx, nny in boxes}
-            for (nnx, nny) in boxes: self[nny, nnx] = SPACE
-            for (nnx, nny) in boxes:
-                v = box_vals[(nnx, nny)]
-                nnx, nny = next_pos_(nnx, nny, move)
-                assert self[nny, nnx] == SPACE, f"Expected SPACE at {nnx},{nny} found {self[nny, nnx]}"
-                self[nny, nnx] = v
-            self[y, x] = SPACE
-            self[ny, nx] = ROBOT
-            self.robot = (nx, ny)
-        else: raise ValueError(f"Unknown object: {self[ny, nx]}")
+        cells, visited, moved = self.cells, self.visited, self.moved
+        moved[0] = self.robot
+        visited[self.robot] = 1
+        n, k = 1, 0
+        blocked = False
+        while k < n:
+            i = moved[k]
+            k += 1
+            for j in [i + p for p in BOX_PARTNERS.get(cells[i], ())] + [i + d]:
+                v = cells[j]
+                if v == WALL:
+                    blocked = True
+                    break
+                if v & BOX_BASE and not visited[j]:
+                    visited[j] = 1
+                    moved[n] = j
+                    n += 1
+            if blocked: break
+
+        for k in range(n):
+            visited[moved[k]] = 0
+        if blocked: return False
+
+        for i in sorted(moved[:n], reverse=d > 0):
+            self.set_cell(i + d, cells[i])
+            self.set_cell(i, SPACE)
+        self.robot += d
+        return True
 
     def move_(self, move):
-        kinds0 = self.num_kinds()
-        if self.is_part2 and move in "^v":
-            self.move_box_pairs(move)
+        if self.debug: kinds0 = self.num_kinds()
+        self.push_(self.deltas[move])
+        if self.debug:
+            kinds = self.num_kinds()
+            assert self.equal_kinds(kinds0), f"Number of objects changed:\n  {kinds0}\n->{kinds}"
+            self.validate()
+
+    def digest(self):
+        """Return a hash of the warehouse's cells."""
+        return hashlib.blake2b(self.cells, digest_size=16).hexdigest()
+
+    def snapshot_(self, num_moves):
+        """Return a compact snapshot of the warehouse after `num_moves` moves."""
+        return ns(num_moves=num_moves, robot=self.robot, cells=zlib.compress(self.cells),
+                  digest=self.digest())
+
+    def restore(self, snapshot):
+        """Set the warehouse to the state in `snapshot`."""
+        self.cells[:] = zlib.decompress(snapshot.cells)
+        self.robot = snapshot.robot
+        self.counts = [0] * 256
+        for v in self.cells: self.counts[v] += 1
+
+    def simulate_movements(self, moves, verbose=False, snapshot_every=0):
+        """ Move the robot by each move in `moves`, which can be any iterable of move characters.
+            If `snapshot_every` > 0 then a snapshot is saved in `snapshots` before the first move,
+            after every `snapshot_every` moves and after the last move.
+        """
+        self.snapshots = []
+        if snapshot_every <= 0:
+            for move in moves: self.move_(move)
         else:
-            self.move_simple(move)
-        kinds = self.num_kinds()
-        assert self.equal_kinds(kinds0), f"Number of objects changed:\n  {kinds0}\n->{kinds}"
-        self.validate()
-
-    def simulate_movements(self, moves, verbose=False):
-        for move in moves: self.move_(move)
+            self.snapshots.append(self.snapshot_(0))
+            i = 0
+            for i, move in enumerate(moves, start=1):
+                self.move_(move)
+                if i % snapshot_every == 0: self.snapshots.append(self.snapshot_(i))
+            if i % snapshot_every != 0: self.snapshots.append(self.snapshot_(i))
+        self.check_counts()
+
+    def replay(self, snapshot, moves, num_moves):
+        """ Resume from `snapshot` and simulate up to move `num_moves`.
+            `moves` is an iterable of all the moves from the start, e.g. a new `moves_()` generator.
+        """
+        self.restore(snapshot)
+        for move in islice(moves, snapshot.num_moves, num_moves): self.move_(move)
+
+    def first_bad_move(self, moves_fn, is_bad):
+        """ Return the first number of moves after which `is_bad(self)` is True, or None if it is never
+            True. `moves_fn()` returns a new iterable of the simulated moves.
+            The snapshots are bisected to find the first bad snapshot, then the moves after the
+            previous snapshot are replayed one at a time. This assumes that once the warehouse is bad
+            it stays bad. The warehouse is left in the state after the first bad move, or in the
+            final state if there is none.
+            Raises ValueError if `simulate_movements` saved no snapshots.
+        """
+        snapshots = self.snapshots
+        if not snapshots: raise ValueError("No snapshots: simulate with snapshot_every > 0")
+        lo, hi = 0, len(snapshots)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            self.restore(snapshots[mid])
+            if is_bad(self): hi = mid
+            else: lo = mid + 1
+        if lo == len(snapshots):
+            self.restore(snapshots[-1])
+            return None
+        if lo == 0: return 0
+
+        self.restore(snapshots[lo - 1])
+        start, stop = snapshots[lo - 1].num_moves, snapshots[lo].num_moves
+        for i, move in enumerate(islice(moves_fn(), start, stop), start=start + 1):
+            self.move_(move)
+            if is_bad(self): return i
+        raise ValueError("Unreachable")
 
     def sum_box(self):  return sum_box_coordinates(self.grid)
 
-def parse_input(input_file):
-    lines = read_lines(input_file)
-    lines = [line.strip() for line in lines]
+def warehouse_lines_(input_file):
+    """Return the lines of the warehouse map at the start of `input_file`."""
+    with open(input_file) as f:
+        lines = (line.strip() for line in f)
+        lines = dropwhile(lambda line: not line, lines)
+        return list(takewhile(lambda line: line.startswith("#"), lines))
+
+def moves_(input_file):
+    """Yield the moves that follow the warehouse map in `input_file` one at a time."""
+    with open(input_file) as f:
+        lines = (line.strip() for line in f)
+        lines = dropwhile(lambda line: not line or line.startswith("#"), lines)
+        for line in lines:
+            if not line: break
+            yield from line
 
-    warehouse_lines = []
-    for i, line in enumerate(lines):
-        if line.startswith("#"): warehouse_lines.append(line)
-        else: break
-
-    while i < len(lines) and not lines[i]:  i += 1 # Skip empty lines
-    lines = lines[i:]
-    for j, line in enumerate(lines):
-        if not line: break
-
-    moves = concat(lines[:j+1])  # Join all lines into a single string
-    return warehouse_lines, moves
+def parse_input(input_file):
+    """Return the warehouse map lines and a generator of the moves in `input_file`."""
+    return warehouse_lines_(input_file), moves_(input_file)
 
 def test_sample_data(movement_data_file, moves, is_part2):
     """Test the sample data with the given moves."""
@@ -767,22 +799,45 @@ def test_sample_data(movement_data_file, moves, is_part2):
     for i, line in enumerate(lines):
         if line.startswith("#"): warehouse_lines.append(line)
         elif len(warehouse_lines) >= 3:
-            warehouse_states.append(Warehouse.from_lines(warehouse_lines, is_part2))
+            warehouse_states.append(Warehouse.from_lines(warehouse_lines, is_part2, debug=True))
             warehouse_lines = []
     if len(warehouse_lines) >= 3:
-        warehouse_states.append(Warehouse.from_lines(warehouse_lines, is_part2))
+        warehouse_states.append(Warehouse.from_lines(warehouse_lines, is_part2, debug=True))
 
     assert len(warehouse_states) == len(moves) + 1, f"moves={len(moves)} != warehouse_states{len(warehouse_states)}"
 
+    expected = [state.digest() for state in warehouse_states]
     warehouse = warehouse_states[0]
     print(f"Initial state\n{warehouse}")
 
-    for i, move in enumerate(moves):
-        expected = str(warehouse_states[i])
-        actual = str(warehouse)
-        assert expected == actual, f"Move {i}: {move}\nexpected\n{expected}\nactual\n{actual}"
-        print(f"Move {move}: {i}\n{actual}")
-        warehouse.move_(move)
+    warehouse.simulate_movements(moves, snapshot_every=1)
+    actual = [snapshot.digest for snapshot in warehouse.snapshots]
+    if actual != expected:
+        i = next(i for i, (e, a) in enumerate(zip(expected, actual)) if e != a)
+        warehouse.restore(warehouse.snapshots[i])
+        assert False, f"After {i} moves\nexpected\n{warehouse_states[i]}\nactual\n{warehouse}"
+
+    middle = warehouse.snapshots[len(moves) // 2]
+    warehouse.replay(middle, iter(moves), len(moves))
+    assert warehouse.digest() == expected[-1], f"Replay from move {middle.num_moves} didn't reach the final state"
+
+    final = expected[-1]
+    i = warehouse.first_bad_move(lambda: iter(moves), lambda w: w.digest() == final)
+    assert i == expected.index(final), f"Expected first bad move {expected.index(final)}, got {i}"
+
+    # Snapshots every K moves where K doesn't divide the number of moves still cover the final state.
+    warehouse.restore(warehouse.snapshots[0])
+    warehouse.simulate_movements(moves, snapshot_every=max(2, len(moves) - 1))
+    assert warehouse.snapshots[-1].num_moves == len(moves), "No snapshot of the final state"
+    i = warehouse.first_bad_move(lambda: iter(moves), lambda w: w.digest() == final)
+    assert i == expected.index(final), f"Expected first bad move {expected.index(final)}, got {i}"
+    i = warehouse.first_bad_move(lambda: iter(moves), lambda w: False)
+    assert i is None and warehouse.digest() == final, "Expected no bad move and the final state"
+    try:
+        warehouse_states[1].first_bad_move(lambda: iter(moves), lambda w: False)
+        assert False, "Expected no snapshots"
+    except ValueError:
+        pass
 
     print(f"Final state:\n{warehouse}\n")
     result = warehouse.sum_box()
@@ -799,13 +854,35 @@ def test_with_sample_data2():
     moves = "<vv<<^^<<^^"
     test_sample_data("aoc2024-day15.data.2", moves, is_part2=True)
 
+def test_wide_boxes():
+    "Test pushing boxes of different widths."
+    lines = [
+        "##########",
+        "#........#",
+        "#.[==]...#",
+        "#..[]....#",
+        "#...@....#",
+        "##########"]
+    expected = [
+        "##########",
+        "#.[==]...#",
+        "#..[]....#",
+        "#...@....#",
+        "#........#",
+        "##########"]
+    warehouse = Warehouse.from_lines(lines, is_part2=True, debug=True)
+    warehouse.simulate_movements("^^")
+    actual = str(warehouse).splitlines()
+    assert actual == expected, f"expected\n{expected}\nactual\n{actual}"
+    result = warehouse.sum_box()
+    assert result == 305, f"Expected 305, got {result}"
+
 def solve(input_file, verbose, is_part2=False):
     warehouse_lines, moves = parse_input(input_file)
     if is_part2: warehouse_lines = part1_to_2(warehouse_lines)
     warehouse = Warehouse.from_lines(warehouse_lines, is_part2)
     if verbose:
         print(f"Initial warehouse:\n{warehouse}")
-        print(f"Moves: {moves}")
 
     warehouse.simulate_movements(moves, verbose)
     if verbose: print(f"Final warehouse:\n{warehouse}")
@@ -825,6 +902,7 @@ args = parse_args("Advent of Code 2024 - Day 15", "problems/aoc2024-day15-input-
 if args.testing:
     test_with_sample_data1()
     test_with_sample_data2()
+    test_wide_boxes()
     exit(0)
 
 t0 = time.time()
@@ -114,8 +114,10 @@
 """
 import time
 import re
-from functools import partial
-from common import parse_args, read_lines
+import math
+import numpy as np
+from functools import partial, lru_cache
+from common import parse_args, read_lines, MyNamespace
 
 RE_REGISTER = re.compile(r"Register\s+([A-C]):\s*(\d+)")
 RE_PROGRAM = re.compile(r"Program:\s*(.*)")
@@ -152,78 +154,361 @@ def result_(output):
     "Return a string representation of the output."
     return ",".join(str(x) for x in output)
 
-def combo_(registers, operand):
-    "Return the combo value of the operand."
-    assert 0 <= operand < 7, f"Invalid operand {operand}"
-    return operand if operand < 4 else registers["ABC"[operand - 4]]
-
-MAX_INTERATIONS = 1000
 INVALID_OUTPUT = [999]
+NO_OUTPUT = -1
+
+def combo_expr_(operand):
+    "Return the Python expression for the combo value of the operand."
+    assert 0 <= operand < 7, f"Invalid operand {operand}"
+    return str(operand) if operand < 4 else "abc"[operand - 4]
+
+def instruction_source_(program, ip, first_output):
+    "Return the Python statements for the instruction at `ip`, excluding JNZ."
+    opcode, operand = program[ip], program[ip + 1]
+    if   opcode == ADV: return [f"a = a >> {combo_expr_(operand)}"]
+    elif opcode == BDV: return [f"b = a >> {combo_expr_(operand)}"]
+    elif opcode == CDV: return [f"c = a >> {combo_expr_(operand)}"]
+    elif opcode == BXL: return [f"b ^= {operand}"]
+    elif opcode == BXC: return ["b ^= c"]
+    elif opcode == BST: return [f"b = {combo_expr_(operand)} & 7"]
+    elif opcode == OUT:
+        if first_output: return [f"return {combo_expr_(operand)} & 7"]
+        return [f"out.append({combo_expr_(operand)} & 7)"]
+    else: raise Exception(f"Unknown opcode {opcode}")
+
+def program_source_(program, first_output=False):
+    """ Return the Python source of a function that runs `program`.
+        The program is split into basic blocks that start at ip 0, the JNZ targets and the
+        instructions after JNZs. The registers are the locals a, b, c and the combo operands are
+        resolved to the locals or constants when the source is generated.
+        Infinite loops are detected at each JNZ: A never increases, so while A is unchanged B and C
+        are bounded and the program either changes A or repeats a state. seen{ip} is the set of
+        (b, c) states at the JNZ since A last changed there, and the program loops forever if the
+        whole (a, b, c) state repeats.
+        If `first_output` is True the function is `run(a)` with B = C = 0 and returns the first
+        output or NO_OUTPUT.
+        Otherwise the function is `run(a, b, c)` and returns (output, a, b, c), with output =
+        INVALID_OUTPUT if the program never halts.
+    """
+    n = len(program)
+    halted = lambda ip: ip < 0 or ip + 1 >= n
+    entries, todo = set(), [0]
+    while todo:
+        ip = todo.pop()
+        if ip in entries or halted(ip): continue
+        entries.add(ip)
+        while not halted(ip) and program[ip] != JNZ: ip += 2
+        if not halted(ip): todo.extend([program[ip + 1], ip + 2])
+    jnzs = [ip for ip in range(0, n - 1) if program[ip] == JNZ]
+
+    if first_output:
+        lines = ["def run(a):", "    b = c = 0"]
+        invalid, halt = "return NO_OUTPUT", "return NO_OUTPUT"
+    else:
+        lines = ["def run(a, b, c):", "    out = []"]
+        invalid, halt = "return INVALID_OUTPUT, a, b, c", "return out, a, b, c"
+    lines += [f"    last_a{ip}, seen{ip} = -1, set()" for ip in jnzs]
+    lines += ["    ip = 0", "    while True:"]
+    for i, entry in enumerate(sorted(entries)):
+        lines.append(f"        {'if' if i == 0 else 'elif'} ip == {entry}:")
+        body = []
+        ip = entry
+        while True:
+            if halted(ip):
+                body.append(halt)
+                break
+            if ip != entry and ip in entries:
+                body += [f"ip = {ip}", "continue"]
+                break
+            if program[ip] == JNZ:
+                target = program[ip + 1]
+                body += ["if a:",
+                         f"    if a != last_a{ip}: last_a{ip}, seen{ip} = a, set()",
+                         f"    elif (b, c) in seen{ip}: {invalid}",
+                         f"    seen{ip}.add((b, c))",
+                         f"    ip = {target}",
+                         "    continue"]
+                ip += 2
+                continue
+            body += instruction_source_(program, ip, first_output)
+            ip += 2
+        lines += [f"            {line}" for line in body]
+    lines.append(f"        {halt}")
+    return "\n".join(lines)
+
+@lru_cache(maxsize=None)
+def compile_program(program, first_output=False):
+    "Return the compiled function for `program`, a tuple. See `program_source_`."
+    namespace = {"INVALID_OUTPUT": INVALID_OUTPUT, "NO_OUTPUT": NO_OUTPUT}
+    exec(program_source_(program, first_output), namespace)
+    return namespace["run"]
 
 def execute_program(program, registers):
-    "Execute the program and return the output."
-    output = []
-    ip = 0
+    "Execute the program, update `registers` and return the output."
+    run = compile_program(tuple(program))
+    output, a, b, c = run(*(registers.get(k, 0) for k in "ABC"))
+    registers.update(A=a, B=b, C=c)
+    return output
 
-    iterations = 0
+def output0_(program, a):
+    "Return the output[0] of the program for the given value of register A."
+    return compile_program(tuple(program), first_output=True)(a)
 
-    while ip < len(program):
-        iterations += 1
-        if iterations > 1000: return INVALID_OUTPUT # Prevent infinite loops
+def batch_combo_(group, operand):
+    "Return the combo value of the operand for the lanes in `group`."
+    assert 0 <= operand < 7, f"Invalid operand {operand}"
+    if operand < 4: return np.full(len(group["lane"]), operand, dtype=np.uint64)
+    return group["abc"[operand - 4]]
+
+def batch_shift_(a, s):
+    "Return `a` >> `s` for uint64 arrays, with shifts of 64 or more giving 0."
+    return np.where(s >= 64, np.uint64(0), a >> np.minimum(s, np.uint64(63)))
+
+def execute_batch(program, a_values, max_outputs=None):
+    """ Execute `program` for every value of register A in `a_values` in lockstep, with B = C = 0.
+        Returns `outputs`, `lengths` where outputs[i, :lengths[i]] is the output for a_values[i] and
+        the rest of outputs[i] is -1. lengths[i] is -1 if the program never halts for a_values[i].
+        `max_outputs` is the number of columns in `outputs` (default len(program)). Outputs after
+        the first `max_outputs` are dropped but are still counted in `lengths`.
+
+        The lanes (values of A) are kept in groups of lanes that are at the same instruction. Each
+        group is a dict of uint64 arrays with one entry per lane. A JNZ splits a group into the lanes
+        that jump and the lanes that don't, and groups that reach the same instruction are merged.
+        Infinite loops are detected per lane in the same way as in `program_source_`. last{ip},
+        lastb{ip} and lastc{ip} are each lane's registers at its previous visit to the JNZ at ip.
+        The (b, c) sets are only kept, in `states`, for lanes whose A repeats at a JNZ.
+    """
+    program = list(program)
+    n = len(program)
+    if max_outputs is None: max_outputs = n
+    a_values = np.asarray(a_values, dtype=np.uint64)
+    m = len(a_values)
+    outputs = np.full((m, max_outputs), -1, dtype=np.int8)
+    lengths = np.zeros(m, dtype=np.int64)
+    jnzs = [ip for ip in range(0, n - 1) if program[ip] == JNZ]
+
+    zeros = np.zeros(m, dtype=np.uint64)
+    group = {"lane": np.arange(m), "count": np.zeros(m, dtype=np.int64),
+             "a": a_values.copy(), "b": zeros.copy(), "c": zeros.copy()}
+    for ip in jnzs:
+        for k in "last", "lastb", "lastc": group[f"{k}{ip}"] = zeros.copy()
+        group[f"seen{ip}"] = np.zeros(m, dtype=bool)
+    states = {}  # (ip, lane): (a, set of (b, c) seen at ip since A became a)
+
+    def subgroup(group, mask): return {k: v[mask] for k, v in group.items()}
+
+    groups = {}
+    def add_group(ip, group):
+        "Add `group` to the groups at `ip`, merging with any group already there."
+        if len(group["lane"]) == 0: return
+        if ip in groups:
+            g = groups[ip]
+            group = {k: np.concatenate([g[k], group[k]]) for k in g}
+        groups[ip] = group
+
+    add_group(0, group)
+    while groups:
+        ip = min(groups)
+        g = groups.pop(ip)
+        if ip + 1 >= n: # Halted
+            lengths[g["lane"]] = g["count"]
+            continue
         opcode, operand = program[ip], program[ip + 1]
-        combo = combo_(registers, operand)
-        ip += 2
-        if   opcode == ADV: registers["A"] = registers["A"] >> combo
-        elif opcode == BDV: registers["B"] = registers["A"] >> combo
-        elif opcode == CDV: registers["C"] = registers["A"] >> combo
-        elif opcode == BXL: registers["B"] ^= operand
-        elif opcode == BXC: registers["B"] ^= registers["C"]
-        elif opcode == BST: registers["B"] = combo & 7
-        elif opcode == OUT: output.append(combo & 7)
+        if   opcode == ADV: g["a"] = batch_shift_(g["a"], batch_combo_(g, operand))
+        elif opcode == BDV: g["b"] = batch_shift_(g["a"], batch_combo_(g, operand))
+        elif opcode == CDV: g["c"] = batch_shift_(g["a"], batch_combo_(g, operand))
+        elif opcode == BXL: g["b"] = g["b"] ^ np.uint64(operand)
+        elif opcode == BXC: g["b"] = g["b"] ^ g["c"]
+        elif opcode == BST: g["b"] = batch_combo_(g, operand) & np.uint64(7)
+        elif opcode == OUT:
+            count = g["count"]
+            ok = count < max_outputs
+            values = batch_combo_(g, operand) & np.uint64(7)
+            outputs[g["lane"][ok], count[ok]] = values[ok]
+            g["count"] = count + 1
         elif opcode == JNZ:
-            if registers["A"] != 0: ip = operand
+            jump = g["a"] != 0
+            repeat = jump & g[f"seen{ip}"] & (g["a"] == g[f"last{ip}"])
+            looping = np.zeros_like(repeat)
+            for k in np.flatnonzero(repeat):
+                lane, a = int(g["lane"][k]), int(g["a"][k])
+                entry = states.get((ip, lane))
+                if entry is None or entry[0] != a:
+                    entry = states[ip, lane] = (a, {(int(g[f"lastb{ip}"][k]), int(g[f"lastc{ip}"][k]))})
+                state = (int(g["b"][k]), int(g["c"][k]))
+                if state in entry[1]: looping[k] = True
+                else: entry[1].add(state)
+            lengths[g["lane"][looping]] = -1
+            g[f"last{ip}"], g[f"lastb{ip}"], g[f"lastc{ip}"] = g["a"], g["b"], g["c"]
+            g[f"seen{ip}"] = jump
+            add_group(operand, subgroup(g, jump & ~looping))
+            add_group(ip + 2, subgroup(g, ~jump))
+            continue
         else: raise Exception(f"Unknown opcode {opcode}")
-    return output
-
-def output0_(program, a):
-    "Return the output[0] of the program for the given value of register A."
-    registers = {"A": a, "B": 0, "C": 0}
-    return execute_program(program, registers)[0]
+        add_group(ip + 2, g)
+
+    outputs[lengths < 0] = -1
+    return outputs, lengths
+
+UNBOUNDED = math.inf
+
+def analyse_loop(program):
+    """ Statically analyse the loop body of `program`.
+        The program must be a single loop: a body without jumps followed by JNZ 0, with A only
+        shifted right by literal amounts.
+        Returns None if the program is not a loop of this form, otherwise `loop` where
+        - loop.shift: The number of bits A is shifted right by each iteration.
+        - loop.windows: windows[i] is the number of low bits of A at the start of an iteration that
+            output i of the iteration depends on. None if an output depends on B or C from the
+            previous iteration or on A shifted by an unbounded amount.
+
+        Each register is tracked as (bits, full, top) where `bits` is the number of low bits of A
+        that the register's low 3 bits depend on, `full` is the number of low bits of A that its
+        full value depends on, and `top` is an upper bound on its value.
+    """
+    n = len(program)
+    if n < 4 or n % 2 != 0 or program[n-2:] != [JNZ, 0]: return None
+    if any(program[ip] == JNZ for ip in range(0, n - 2, 2)): return None
+
+    def top_(top): return UNBOUNDED if top == UNBOUNDED else (1 << int(top).bit_length()) - 1
+
+    shift = 0
+    registers = {"B": None, "C": None} # None: Set in the previous iteration
+    windows = []
+
+    def combo_(operand):
+        "Return the abstract value of combo operand `operand`."
+        if operand < 4: return (0, 0, operand)
+        if operand == 4: return (shift + 3, UNBOUNDED, UNBOUNDED)
+        return registers["BC"[operand - 5]]
+
+    def shifted_(operand):
+        "Return the abstract value of A >> combo operand `operand`."
+        v = combo_(operand)
+        if v is None or v[2] == UNBOUNDED: return None
+        return (max(shift + v[2] + 3, v[1]), UNBOUNDED, UNBOUNDED)
+
+    def xor_(u, v):
+        "Return the abstract value of `u` ^ `v`."
+        if u is None or v is None: return None
+        return (max(u[0], v[0]), max(u[1], v[1]), top_(max(u[2], v[2])))
+
+    for ip in range(0, n - 2, 2):
+        opcode, operand = program[ip], program[ip + 1]
+        if opcode == ADV:
+            if operand >= 4: return None
+            shift += operand
+        elif opcode == BDV: registers["B"] = shifted_(operand)
+        elif opcode == CDV: registers["C"] = shifted_(operand)
+        elif opcode == BXL: registers["B"] = xor_(registers["B"], (0, 0, operand))
+        elif opcode == BXC: registers["B"] = xor_(registers["B"], registers["C"])
+        elif opcode == BST:
+            v = combo_(operand)
+            registers["B"] = None if v is None else (v[0], v[0], 7)
+        elif opcode == OUT:
+            v = combo_(operand)
+            if windows is not None: windows = None if v is None else windows + [v[0]]
+        else: raise Exception(f"Unknown opcode {opcode}")
+    return MyNamespace(shift=shift, windows=windows)
 
-def dfs(program, pos, a0):
+def dfs(program, pos, a0, shift=3, table=None):
     """Depth-first search for the value of register A that produces the output `program`.
 
         `program`: The program's instructions and expected output.
         `pos`: The current position in the program, starting from the end.
         `a0`: The current value of register A. (a0 covers program[pos+1:]).
+        `shift`: The number of bits A is shifted right by each output.
+        `table`: Optional table of output0_ for every value of the low bits of A that the output
+            depends on. See `output_table_`.
         Returns: Register A value that produces the output program[pos+1:].
 
         Base Case: If `pos` is less than 0, the search has reached the beginning of the
             program, and `a0` is returned. (a0 it covers program)
-        Iterative Search: The function iterates over `a0` << 3 to (`a0` << 3) + 7,the potential
-            values for register A shifted left by 3 bits.
+        Iterative Search: The function iterates over `a0` << shift to (`a0` << shift) +
+            2^shift - 1, the potential values for register A shifted left by `shift` bits.
         Output Check: For each value of `a`, if program[pos] == output0_(a), recurse to find
             `a1` = dfs(program, pos - 1, a), the register A value for (`pos` - 1).
 
-        This search is guaranteed to find the correct value of register A because the program
-        the output is the low 3 bits of the register A value shifted left by 3 bits and possibly
-        XORed with a constant or another register value which in turn is the low 3 bits of the
-        register A value shifted left by 3 bits
+        This search is guaranteed to find the correct value of register A for programs that output
+        one value per iteration and don't carry B or C between iterations because output0_(a)
+        depends only on the low bits of `a`, and the bits above the low `shift` bits are fixed by
+        `a0`. The first value found is the lowest because the lowest values are searched first.
     """
-    N = 3 # Number of bits
     if pos < 0: return a0
-    for a in range(a0 << N, (a0 << N) + (1 << N)):
-        if output0_(program, a) == program[pos]:
-            a1 = dfs(program, pos - 1, a)
+    for a in range(max(a0 << shift, 1), (a0 << shift) + (1 << shift)):
+        output = table[a & (len(table) - 1)] if table is not None else output0_(program, a)
+        if output == program[pos]:
+            a1 = dfs(program, pos - 1, a, shift, table)
             if a1 >= 0: return a1
     return -1
 
-def test_program(program, registers, expected_output, verbose):
-    "Test the program against the expected output."
-    output = execute_program(program, registers, verbose)
+MAX_TABLE_BITS = 16
+
+def output_table_(program, window):
+    """ Return table[i] = output0_(program, i) for i < 2^`window`, computed in one `execute_batch`.
+        If output 0 depends only on the low `window` bits of A then output0_(program, a) is
+        table[a & (2^window - 1)].
+    """
+    outputs, _ = execute_batch(program, np.arange(1 << window), max_outputs=1)
+    return outputs[:, 0].tolist()
+
+MAX_FRONTIER = 1_000
+MAX_LEVELS = 64
+
+def bfs(program, shift=None, num_outputs=None):
+    """ Bounded breadth-first search for the lowest value of register A that produces the output
+        `program`. This is the fallback for programs that `dfs` can't solve.
+        Each level appends `shift` low bits to the values of A in the frontier and keeps the values
+        whose output is a non-empty suffix of `program`, and has `num_outputs` values per level if
+        `num_outputs` is not None. The MAX_FRONTIER lowest values are kept.
+        All shifts from 1 to 7 are tried if `shift` is None.
+        Returns -1 if no value is found.
+    """
+    n = len(program)
+    for N in [shift] if shift else range(1, 8):
+        frontier = [0]
+        for level in range(1, MAX_LEVELS + 1):
+            if not frontier: break
+            solutions, next_frontier = [], []
+            for a0 in frontier:
+                for a in range(max(a0 << N, 1), (a0 << N) + (1 << N)):
+                    output = execute_program(program, {"A": a})
+                    if num_outputs is not None and len(output) != level * num_outputs: continue
+                    if output == program: solutions.append(a)
+                    elif 0 < len(output) < n and output == program[n - len(output):]: next_frontier.append(a)
+            if solutions: return min(solutions)
+            frontier = sorted(next_frontier)[:MAX_FRONTIER]
+    return -1
+
+def solve_quine(program, verbose=False):
+    """Return the lowest value of register A that makes `program` output itself, or -1 if there is none.
+        `dfs` is used if `analyse_loop` shows that each iteration outputs one value that depends only
+        on A. If that value depends on at most MAX_TABLE_BITS low bits of A (loop.windows[0]) then
+        `dfs` looks the outputs up in an `output_table_` instead of running the program.
+        Otherwise `bfs` is used.
+    """
+    loop = analyse_loop(program)
+    if verbose: print(f"Loop: {loop}")
+    if not loop: return bfs(program)
+    if loop.shift == 0: return -1 # A never changes, so the program halts after one iteration or never
+    if loop.windows is None: return bfs(program, loop.shift)
+    num_outputs = len(loop.windows)
+    if num_outputs == 0 or len(program) % num_outputs != 0: return -1
+    if num_outputs == 1:
+        window = loop.windows[0]
+        table = output_table_(program, window) if window <= MAX_TABLE_BITS else None
+        return dfs(program, len(program) - 1, 0, loop.shift, table)
+    return bfs(program, loop.shift, num_outputs)
+
+def test_program(program, registers, expected_output, expected_registers, verbose):
+    "Test the program against the expected output and register values."
+    output = execute_program(program, registers)
     result = result_(output)
+    if verbose: print(program_source_(tuple(program)))
     assert result == expected_output, f"{program}: Expected '{expected_output}', got '{result}'"
-    print(f"Test passed: {result}")
+    for k, v in expected_registers.items():
+        assert registers[k] == v, f"{program}: Expected {k}={v}, got {reg_str(registers)}"
+    print(f"Test passed: {result} {reg_str(registers)}")
 
 def test1(verbose):
     """
@@ -237,11 +522,57 @@ def test1(verbose):
     """
     test = partial(test_program, verbose=verbose)
 
-    test([2, 6],             {"C": 9},    "")
-    test([5, 0, 5, 1, 5, 4], {"A": 10},   "0,1,2")
-    test([0, 1, 5, 4, 3, 0], {"A": 2024}, "4,2,5,6,7,7,7,7,3,1,0")
-    test([1, 7],             {"B": 29},   "")
-    test([4, 0],             {"B": 2024, "C": 43690}, "44354")
+    test([2, 6],             {"C": 9},    "",                      {"B": 1})
+    test([5, 0, 5, 1, 5, 4], {"A": 10},   "0,1,2",                 {})
+    test([0, 1, 5, 4, 3, 0], {"A": 2024}, "4,2,5,6,7,7,7,7,3,1,0", {"A": 0})
+    test([1, 7],             {"B": 29},   "",                      {"B": 26})
+    test([4, 0],             {"B": 2024, "C": 43690}, "",          {"B": 44354})
+    test([1, 1, 3, 0],       {"A": 1},    "999",                   {}) # Infinite loop
+    test([1, 7, 0, 5, 3, 0, 3, 4], {"A": 201},  "",                {}) # A >> B stays the same then shrinks
+    test([1, 5, 0, 5, 3, 0, 5, 0], {"A": 2177}, "0",               {})
+
+def test2(verbose):
+    "Test the static analysis and the quine solver."
+    tests = [
+        ([0, 3, 5, 4, 3, 0],                                 3, [6],  117440),
+        ([0, 3, 7, 2, 5, 4, 3, 0],                           3, [6],  7515840),
+        ([2, 4, 1, 3, 7, 5, 4, 2, 0, 3, 1, 5, 5, 5, 3, 0],  3, [10], 236555995274861),
+        ([0, 2, 0, 2, 5, 4, 3, 0],                           4, [7],  877789696),
+        ([0, 1, 1, 5, 5, 5, 3, 0],                           1, None, -1),
+    ]
+    for program, shift, windows, expected in tests:
+        loop = analyse_loop(program)
+        assert (loop.shift, loop.windows) == (shift, windows), f"{program}: Expected {shift} {windows}, got {loop}"
+        if windows and len(windows) == 1:
+            table = output_table_(program, windows[0])
+            for a in range(1, 1 << 20, 997):
+                assert table[a % len(table)] == output0_(program, a), f"{program} A={a}: Output not in the window"
+        a = solve_quine(program, verbose)
+        assert a == expected, f"{program}: Expected A={expected}, got {a}"
+        if a >= 0: assert execute_program(program, {"A": a}) == program
+        print(f"Test passed: {result_(program)} shift={shift} windows={windows} A={a}")
+
+def test3(verbose):
+    "Test the batch interpreter against `execute_program`."
+    programs = [
+        [0, 1, 5, 4, 3, 0],
+        [0, 3, 7, 2, 5, 4, 3, 0],
+        [2, 4, 1, 3, 7, 5, 4, 2, 0, 3, 1, 5, 5, 5, 3, 0],
+        [0, 2, 0, 2, 5, 4, 3, 0],
+        [1, 1, 3, 0],               # Infinite loop unless A = 0
+        [5, 4, 0, 1, 3, 6, 5, 5],   # Jump to the last instruction
+        [2, 1, 3, 0],               # bst with a literal operand
+        [1, 7, 0, 5, 3, 0, 3, 4],   # A >> B can stay the same then shrink
+        [1, 5, 0, 5, 3, 0, 5, 0],
+    ]
+    a_values = list(range(100)) + [201, 2024, 2177, 117440, 236555995274861, (1 << 64) - 1]
+    for program in programs:
+        outputs, lengths = execute_batch(program, a_values, max_outputs=100)
+        for a, row, length in zip(a_values, outputs, lengths):
+            expected = execute_program(program, {"A": a})
+            actual = INVALID_OUTPUT if length < 0 else list(row[:length])
+            assert actual == expected, f"{program} A={a}: Expected {expected}, got {actual}"
+        print(f"Test passed: {result_(program)} {len(a_values)} values of A")
 
 def part1(program, registers):
     """Solution to part 1. "4,6,3,5,6,3,5,2,1,0" for the test input. ("1,7,6,5,1,0,5,0,7")"""
@@ -249,9 +580,9 @@ def part1(program, registers):
     result = result_(output)
     print(f"Part 1: The program output is: {result}")
 
-def part2(program):
+def part2(program, verbose=False):
     "Solution to part 2. 45 for the test input. (236555995274861)"
-    a = dfs(program, len(program) - 1, 0)
+    a = solve_quine(program, verbose)
     if a < 0:
         print("No solution found")
         return
@@ -267,6 +598,8 @@ args = parse_args("Advent of Code 2024 - Day 17", "problems/aoc2024-day17-input-
 lines = read_lines(args.input)
 if args.testing:
     test1(args.verbose)
+    test2(args.verbose)
+    test3(args.verbose)
     exit()
 
 program, registers = parse_program(lines)
@@ -274,7 +607,7 @@ t0 = time.time()
 part1(program, registers)
 t1 = time.time() - t0
 t0 = time.time()
-part2(program)
+part2(program, args.verbose)
 t2 = time.time() - t0
 print(f"Part 1: {t1:.1f} sec")
 print(f"Part 2: {t2:.1f} sec")
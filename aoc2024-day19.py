@@ -102,8 +102,7 @@
 
 """
 import time
-from functools import lru_cache
-from common import parse_args, read_lines
+from common import parse_args, read_lines, pool_processes_, fork_pool
 
 def lines_to_towels_and_designs(lines):
     """ Return a tuple of patterns and designs from `lines`.
@@ -120,37 +119,55 @@ def lines_to_towels_and_designs(lines):
     print(f"patterns: {[p for p in patterns if len(p) <= 2]}")
     return patterns, designs
 
-global_towels = []
-
-@lru_cache(maxsize=None)
-def dfs_all(design, depth):
-    """ Returns n, ok where
-        - n is the number of ways `design` can be made by joining a combination of `towels`.
-        - ok is True if `design` can made by joining a combination of `towels`.
-        `global_towels` is a list of available towel patterns.
-        `design` is the desired design.
-        Check if `design` starts with any of the patterns, and if so, recursively check
-        design[len(pattern):].
+class TowelTrie:
+    """ A trie of towel patterns.
+        Node 0 is the root. children[node] maps a colour to the next node and terminal[node] is True
+        if the path from the root to `node` spells a towel pattern.
     """
-    if len(design) == 0: return 1, True
-    n, match = 0, False
-    for pattern in global_towels:
-        if design[:len(pattern)] == pattern:
-            m, ok = dfs_all(design[len(pattern):], depth + 1)
-            if ok:
-                n += m
-                match = True
-    return n, match
+    def __init__(self, towels):
+        self.children = [{}]
+        self.terminal = [False]
+        for towel in towels: self.add(towel)
+
+    def add(self, towel):
+        "Add `towel` to the trie."
+        node = 0
+        for c in towel:
+            nxt = self.children[node].get(c)
+            if nxt is None:
+                nxt = len(self.children)
+                self.children[node][c] = nxt
+                self.children.append({})
+                self.terminal.append(False)
+            node = nxt
+        self.terminal[node] = True
+
+    def num_ways(self, design):
+        """ Returns the number of ways `design` can be made by joining a combination of towels.
+            ways[i] is the number of ways of making design[i:]. It is computed from the end of
+            `design` by walking the trie from design[i] and adding ways[j] for each towel that
+            matches design[i:j]. This takes O(len(design) * longest towel) time.
+        """
+        children, terminal = self.children, self.terminal
+        n = len(design)
+        ways = [0] * (n + 1)
+        ways[n] = 1
+        for i in range(n - 1, -1, -1):
+            node, total = 0, 0
+            for j in range(i, n):
+                node = children[node].get(design[j])
+                if node is None: break
+                if terminal[node]: total += ways[j + 1]
+            ways[i] = total
+        return ways[0]
 
 def num_valid_designs(towels, design):
     """ Returns the number of ways `design` can be made by joining a combination of `towels`.
-        `towels` is a list of available towel patterns.
+        `towels` is a list of available towel patterns or a TowelTrie of them.
         `design` is the desired design.
     """
-    global global_towels
-    global_towels = towels
-    n, _ = dfs_all(design, 0)
-    return n
+    if not isinstance(towels, TowelTrie): towels = TowelTrie(towels)
+    return towels.num_ways(design)
 
 def Q(text): return f"'{text}'"
 
@@ -163,30 +180,91 @@ def test1():
         print(f"{Q(design):8}: got {actual:1}, expected {expected:1}")
         assert actual == expected
 
-def part1(towels, designs):
-    "Solution to part 1. 6 for the test input. (353)"
-    count = sum(num_valid_designs(towels, design) > 0 for design in designs)
+# Parallel design counting.
+# The designs are split into chunks that are counted in a pool of worker processes. The trie is
+# passed to each worker once by the pool initializer.
+
+CHUNKS_PER_PROCESS = 4
+MIN_PARALLEL_DESIGNS = 1000  # Fewer designs than this are counted in the main process.
+
+worker_trie = None
+
+def init_worker(trie):
+    "Pool initializer: Set the trie used by `count_designs` in this process."
+    global worker_trie
+    worker_trie = trie
+
+def count_designs(designs):
+    "Returns the number of valid designs and the total number of ways to make `designs`."
+    num_valid, num_ways = 0, 0
+    for design in designs:
+        n = worker_trie.num_ways(design)
+        num_valid += n > 0
+        num_ways += n
+    return num_valid, num_ways
+
+def count_designs_parallel(trie, designs, processes=None):
+    """ Returns the number of valid designs and the total number of ways to make `designs` with the
+        towels in `trie`, counted over a pool of `processes` processes (default: all cores).
+    """
+    processes = pool_processes_(len(designs), MIN_PARALLEL_DESIGNS, processes)
+    if processes == 1:
+        init_worker(trie)
+        return count_designs(designs)
+    num_chunks = processes * CHUNKS_PER_PROCESS
+    chunks = [designs[i::num_chunks] for i in range(num_chunks)]
+    with fork_pool(processes, init_worker, (trie,)) as pool:
+        counts = pool.map(count_designs, chunks)
+    return sum(v for v, _ in counts), sum(w for _, w in counts)
+
+def test2():
+    "Test that the pool of processes gives the same counts as the main process."
+    trie = TowelTrie(['r', 'wr', 'b', 'g', 'bwu', 'rb', 'gb', 'br'])
+    designs = ['brwrr', 'bggr', 'gbbr', 'rrbgbr', 'ubwu', 'bwurrg', 'brgr', 'bbrgwb']
+    designs = designs * (MIN_PARALLEL_DESIGNS // len(designs) + 1)  # Enough to use the pool.
+    expected = count_designs_parallel(trie, designs, processes=1)
+    counts = count_designs_parallel(trie, designs, processes=3)
+    assert counts == expected, f"Expected {expected}, got {counts}"
+    print(f"Test passed: {counts} for {len(designs)} designs in 3 processes")
+
+def part1(towels, designs, counts=None):
+    """ Solution to part 1. 6 for the test input. (353)
+        `counts` is the result of `count_designs_parallel` if it has already been run.
+    """
+    if counts:
+        count, _ = counts
+    else:
+        trie = TowelTrie(towels)
+        count = sum(num_valid_designs(trie, design) > 0 for design in designs)
     print(f"Part 1: {count} of {len(designs)} designs are valid")
 
-def part2(towels, designs):
-    "Solution to part 2. 16 for the test input. (880877787214477)"
-    count = sum(num_valid_designs(towels, design) for design in designs)
+def part2(towels, designs, counts=None):
+    """ Solution to part 2. 16 for the test input. (880877787214477)
+        `counts` is the result of `count_designs_parallel` if it has already been run.
+    """
+    if counts:
+        _, count = counts
+    else:
+        trie = TowelTrie(towels)
+        count = sum(num_valid_designs(trie, design) for design in designs)
     print(f"Part 2: {count} designs are possible")
 
 args = parse_args("Advent of Code 2024 - Day 19", "problems/aoc2024-day19-input-test.txt")
 
 if args.testing:
     test1()
+    test2()
     exit()
 
 lines = read_lines(args.input)
 towels, designs = lines_to_towels_and_designs(lines)
 
 t0 = time.time()
-part1(towels, designs)
+counts = count_designs_parallel(TowelTrie(towels), designs) if args.optimise else None
+part1(towels, designs, counts)
 t1 = time.time() - t0
 t0 = time.time()
-part2(towels, designs)
+part2(towels, designs, counts)
 t2 = time.time() - t0
 print(f"Part 1: {t1:.1f} sec")
 print(f"Part 2: {t2:.1f} sec")
@@ -153,144 +153,185 @@
 """
 import time
 from typing import List, Dict
-from common import parse_args, read_lines, number_, concat
+from common import parse_args, read_lines, read_text, number_, concat
 
 class Coord:
     def __init__(self, x: int, y: int):
         self.x = x
         self.y = y
 
-NUMBER_PAD = {
-    "A": Coord(2, 0),
-    "0": Coord(1, 0),
-    "1": Coord(0, 1),
-    "2": Coord(1, 1),
-    "3": Coord(2, 1),
-    "4": Coord(0, 2),
-    "5": Coord(1, 2),
-    "6": Coord(2, 2),
-    "7": Coord(0, 3),
-    "8": Coord(1, 3),
-    "9": Coord(2, 3)
-}
-
-DIRECTION_PAD = {
-    "A": Coord(2, 1),
-    "^": Coord(1, 1),
-    "<": Coord(0, 0),
-    "v": Coord(1, 0),
-    ">": Coord(2, 0)
-}
+GAP = "#"   # Marks a gap in a keypad layout.
+
+NUMBER_PAD_TEXT = """
+789
+456
+123
+#0A
+"""
+
+DIRECTION_PAD_TEXT = """
+#^A
+<v>
+"""
+
+MOVES = {">": (1, 0), "<": (-1, 0), "^": (0, 1), "v": (0, -1)}
+
+class Keypad:
+    """ A keypad described by a text grid of keys with GAP marking gaps, e.g. DIRECTION_PAD_TEXT.
+        positions[key] is the Coord of `key`, with y increasing upwards.
+        paths[a][b] are the candidate moves (strings of <>^v) that move the arm from key `a` to key
+        `b`. These are the shortest paths that don't cross a gap with the fewest changes of
+        direction, since each change of direction costs extra presses on the controlling keypad.
+        On the puzzle's keypads these are the horizontal-then-vertical and vertical-then-horizontal
+        paths that avoid the gap.
+    """
+    def __init__(self, text: str, gap: str = GAP):
+        rows = [row for row in text.splitlines() if row.strip()]
+        assert all(len(row) == len(rows[0]) for row in rows), f"Rows have different lengths:\n{text}"
+        self.positions = {c: Coord(x, len(rows) - 1 - y)
+                          for y, row in enumerate(rows) for x, c in enumerate(row) if c != gap}
+        assert len(self.positions) == sum(c != gap for row in rows for c in row), f"Duplicate keys:\n{text}"
+        self.keys = list(self.positions)
+        self.cells = {(c.x, c.y) for c in self.positions.values()}
+        self.paths = {a: self.key_paths_(a) for a in self.keys}
+
+    def key_paths_(self, a: str) -> Dict[str, List[str]]:
+        """ Returns paths[b] for all keys `b`. See `paths`.
+            A BFS from `a` finds the distance to each cell. Then the cells are visited in order of
+            distance keeping best[(cell, move)] = (turns, paths) for the paths that reach `cell`
+            ending with `move` with the fewest turns.
+        """
+        p = self.positions[a]
+        start = (p.x, p.y)
+        dist = {start: 0}
+        order = [start]
+        for x, y in order:
+            for dx, dy in MOVES.values():
+                cell = (x + dx, y + dy)
+                if cell in self.cells and cell not in dist:
+                    dist[cell] = dist[(x, y)] + 1
+                    order.append(cell)
+
+        best = {(start, ""): (0, [""])}
+        for cell in order:
+            for last in ["", *MOVES]:
+                if (cell, last) not in best: continue
+                turns, paths = best[(cell, last)]
+                for move, (dx, dy) in MOVES.items():
+                    nxt = (cell[0] + dx, cell[1] + dy)
+                    if dist.get(nxt) != dist[cell] + 1: continue
+                    n = turns + (last != "" and move != last)
+                    m, prev = best.get((nxt, move), (n + 1, []))
+                    if n < m: best[(nxt, move)] = (n, [path + move for path in paths])
+                    elif n == m: prev.extend(path + move for path in paths)
+
+        key_paths = {}
+        for b, q in self.positions.items():
+            ends = [best[((q.x, q.y), last)] for last in ["", *MOVES] if ((q.x, q.y), last) in best]
+            fewest = min(turns for turns, _ in ends)
+            key_paths[b] = [path for turns, paths in ends if turns == fewest for path in paths]
+        return key_paths
+
+def read_keypad(filename: str, gap: str = GAP) -> Keypad:
+    """Returns the Keypad described by the text grid in `filename`."""
+    return Keypad(read_text(filename), gap)
+
+NUMBER_PAD = Keypad(NUMBER_PAD_TEXT)
+DIRECTION_PAD = Keypad(DIRECTION_PAD_TEXT)
 
 def complexity_(line: str, num_presses: int) -> int:
     """Return the complexity of `line`."""
     return number_(line) * num_presses
 
-def steps_(direction_presses: List[str]) -> List[List[str]]:
-    """Returns the steps resulting from `direction_presses`."""
-    steps = []
-    current = []
-    for char in direction_presses:
-        current.append(char)
-        if char == "A":
-            steps.append(current)
-            current = []
-    return steps
-
-def numeric_presses_(line: str, start: str) -> List[str]:
-    """Returns the numeric presses resulting from `line`."""
-    current = NUMBER_PAD[start]
-    presses = []
-
-    for char in line:
-        dest = NUMBER_PAD[char]
-        dx, dy = dest.x - current.x, dest.y - current.y
-
-        horizontal = [">" if dx >= 0 else "<"] * abs(dx)
-        vertical = ["^" if dy >= 0 else "v"] * abs(dy)
-
-        if current.y == 0 and dest.x == 0:
-            presses.extend(vertical)
-            presses.extend(horizontal)
-        elif current.x == 0 and dest.y == 0:
-            presses.extend(horizontal)
-            presses.extend(vertical)
-        elif dx < 0:
-            presses.extend(horizontal)
-            presses.extend(vertical)
-        else:
-            presses.extend(vertical)
-            presses.extend(horizontal)
-
-        current = dest
-        presses.append("A")
-
-    return presses
-
-def direction_presses_(numeric_presses: List[str], start: str) -> List[str]:
-    """Returns the direction presses resulting from `numeric_presses`."""
-    current = DIRECTION_PAD[start]
-    direction_presses = []
-
-    for char in numeric_presses:
-        dest = DIRECTION_PAD[char]
-        dx, dy = dest.x - current.x, dest.y - current.y
-
-        horz = [">" if dx >= 0 else "<"] * abs(dx)
-        vert = ["^" if dy >= 0 else "v"] * abs(dy)
-
-        if current.x == 0 and dest.y == 1:
-            direction_presses.extend(horz)
-            direction_presses.extend(vert)
-        elif current.y == 1 and dest.x == 0:
-            direction_presses.extend(vert)
-            direction_presses.extend(horz)
-        elif dx < 0:
-            direction_presses.extend(horz)
-            direction_presses.extend(vert)
-        else:
-            direction_presses.extend(vert)
-            direction_presses.extend(horz)
-
-        current = dest
-        direction_presses.append("A")
-
-    return direction_presses
-
-def num_presses_after_robot(numeric_presses: List[str],
-                           num_robots: int, robot: int,
-                           cache: Dict[str, List[int]]) -> int:
-    """Returns the number of presses after the `robot` robot."""
-    key = concat(numeric_presses)
-    if key in cache and cache[key][robot - 1] != 0: return cache[key][robot - 1]
-
-    cache.setdefault(key, [0] * num_robots)
-    direction_presses = direction_presses_(numeric_presses, "A")
-    cache[key][0] = len(direction_presses)
-
-    if robot == num_robots: return len(direction_presses)
-
-    steps = steps_(direction_presses)
-    count = 0
-    for step in steps:
-        cnt = num_presses_after_robot(step, num_robots, robot + 1, cache)
-        step_key = concat(step)
-        cache.setdefault(step_key, [0] * num_robots)
-        cache[step_key][0] = cnt
-        count += cnt
-
-    cache[key][robot - 1] = count
-    return count
+# Press cost engine.
+# costs[a][b] is the fewest presses the human must make for a robot to move its arm from key `a` to
+# key `b` on its keypad and press `b`. The human presses keys directly so their costs are all 1.
+# Each robot's costs are computed from the costs of the directional keypad that controls it.
+
+def sequence_cost_(costs: Dict[str, Dict[str, int]], presses: str) -> int:
+    """Returns the cost of `presses` on a keypad with `costs`, starting from the A key."""
+    return sum(costs[a][b] for a, b in zip("A" + presses, presses))
+
+def best_paths_(pad: Keypad, direction_costs: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, str]]:
+    """Returns best[a][b], the cheapest of pad.paths[a][b] followed by A for a robot using `pad` that
+        is controlled by a directional keypad with costs `direction_costs`.
+    """
+    return {a: {b: min((path + "A" for path in pad.paths[a][b]),
+                       key=lambda presses: sequence_cost_(direction_costs, presses))
+                for b in pad.keys}
+            for a in pad.keys}
+
+def press_costs_(pad: Keypad, direction_costs: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    """Returns the costs matrix for a robot using `pad` that is controlled by a directional keypad
+        with costs `direction_costs`.
+    """
+    best = best_paths_(pad, direction_costs)
+    return {a: {b: sequence_cost_(direction_costs, best[a][b]) for b in pad.keys} for a in pad.keys}
+
+class PressCostEngine:
+    """ Computes the fewest human presses needed to type codes through a chain of `num_robots`
+        robots using directional keypads and a robot using a numeric keypad.
+        direction_costs[k] is the costs matrix for the kth robot on a directional keypad, with
+        k = 0 for the human.
+        `number_pad` and `direction_pad` are Keypads with any layout.
+    """
+    def __init__(self, num_robots: int, number_pad: Keypad = NUMBER_PAD, direction_pad: Keypad = DIRECTION_PAD):
+        self.number_pad, self.direction_pad = number_pad, direction_pad
+        costs = {a: {b: 1 for b in direction_pad.keys} for a in direction_pad.keys}
+        self.direction_costs = [costs]
+        for _ in range(num_robots):
+            costs = press_costs_(direction_pad, costs)
+            self.direction_costs.append(costs)
+        self.number_costs = press_costs_(number_pad, costs)
+
+    def num_presses(self, code: str) -> int:
+        """Returns the fewest human presses needed to type `code` on the numeric keypad."""
+        return sequence_cost_(self.number_costs, code)
+
+    def presses(self, code: str) -> str:
+        """Returns a shortest sequence of human presses that types `code` on the numeric keypad."""
+        costs = self.direction_costs
+        best = best_paths_(self.number_pad, costs[-1])
+        presses = concat(best[a][b] for a, b in zip("A" + code, code))
+        for k in range(len(costs) - 1, 0, -1):
+            best = best_paths_(self.direction_pad, costs[k - 1])
+            presses = concat(best[a][b] for a, b in zip("A" + presses, presses))
+        return presses
 
 def total_complexity_(lines: List[str], num_robots: int) -> int:
     """Returns the total complexity of `lines`."""
-    total_complexity = 0
-    cache = {}
-    for line in lines:
-        presses = numeric_presses_(line, "A")
-        num_presses = num_presses_after_robot(presses, num_robots, 1, cache)
-        total_complexity += complexity_(line, num_presses)
-    return total_complexity
+    engine = PressCostEngine(num_robots)
+    return sum(complexity_(line, engine.num_presses(line)) for line in lines)
+
+def test1():
+    "Test the cost engine against the example codes and press sequences."
+    codes = ["029A", "980A", "179A", "456A", "379A"]
+    expected = [68, 60, 68, 64, 64]
+    engine = PressCostEngine(2)
+    for code, n in zip(codes, expected):
+        presses = engine.presses(code)
+        assert engine.num_presses(code) == n, f"{code}: Expected {n}, got {engine.num_presses(code)}"
+        assert len(presses) == n, f"{code}: Expected {n}, got {len(presses)} {presses}"
+    total = total_complexity_(codes, 2)
+    assert total == 126384, f"Expected 126384, got {total}"
+    print(f"Test passed: {total}")
+
+def test2():
+    "Test the cost engine on a larger keypad."
+    hex_pad = Keypad("""
+        #CDEF
+        89AB#
+        4567#
+        #0123
+        """.replace(" ", ""))
+    assert hex_pad.paths["8"]["0"] == [">vv"], hex_pad.paths["8"]["0"]
+    assert hex_pad.paths["C"]["4"] == ["vv<"], hex_pad.paths["C"]["4"]
+    assert sorted(hex_pad.paths["8"]["3"]) == [">>>vv>", ">>vv>>", ">vv>>>"], hex_pad.paths["8"]["3"] # No L-shaped path
+    engine = PressCostEngine(2, number_pad=hex_pad)
+    for code in ["C0FA", "8D3", "F08B"]:
+        presses = engine.presses(code)
+        assert len(presses) == engine.num_presses(code), f"{code}: {len(presses)} != {engine.num_presses(code)}"
+        print(f"Test passed: {code} {len(presses)}")
 
 def part1(lines):
     "Solution to part 1. (176650)"
@@ -304,6 +345,11 @@ def part2(lines):
 
 args = parse_args("Advent of Code 2024 - Day 21", "problems/aoc2024-day21-input.txt")
 
+if args.testing:
+    test1()
+    test2()
+    exit()
+
 lines = read_lines(args.input)
 
 t0 = time.time()
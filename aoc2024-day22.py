@@ -162,25 +162,12 @@
 
 """
 import time
-from typing import List, Dict
-from common import parse_args, read_lines, number_
-
-class BananaPrice:
-    def __init__(self, num, change): self.num, self.change = num, change
-
-    @staticmethod
-    def from_previous(input_num: int, previous: int):
-        num = input_num % 10
-        change = num - previous
-        return BananaPrice(num=num, change=change)
-
-class Sequence:
-    "A sequence of four changes in price."
-    def __init__(self, changes):
-        assert len(changes) == 4
-        self.changes = tuple(changes)
-    def __hash__(self): return hash(self.changes)
-    def __eq__(self, other): return self.changes == other.changes
+from multiprocessing import shared_memory
+import numpy as np
+from common import parse_args, read_lines, number_, pool_processes_, fork_pool
+
+NUM_SECRETS = 2000      # The number of new secret numbers each buyer generates.
+PRUNE = 0xFFFFFF        # Pruning is modulo 16777216 = 2^24.
 
 def mix_prune(num: int, secret_num): return (num ^ secret_num) % 0x1000000
 
@@ -191,62 +178,197 @@ def secret_number_(num):
     num = mix_prune(num * 2048, num)
     return num
 
-def max_num_bananas_(banana_prices):
+def next_secrets_(secrets):
+    """ Update `secrets`, a uint32 array of secret numbers, to the next secret numbers in place.
+        Multiplying by 64 and 2048 are shifts by 6 and 11 bits, and dividing by 32 is a shift by 5.
+        Bits shifted above bit 31 are lost but pruning only keeps the low 24 bits.
+    """
+    secrets ^= (secrets << 6) & PRUNE
+    secrets ^= secrets >> 5
+    secrets ^= (secrets << 11) & PRUNE
+    return secrets
+
+NUM_CHANGES = 19                    # Price changes are in [-9, 9].
+NUM_SEQUENCES = NUM_CHANGES ** 4    # The number of sequences of 4 changes.
+
+def sequence_codes_(changes):
+    """ Returns an int32 (steps - 3, buyers) array of the codes of the sequences of 4 changes in
+        `changes`, an int8 (steps, buyers) array. The code of changes c0, c1, c2, c3 is the base 19
+        number (c0+9)(c1+9)(c2+9)(c3+9) in [0, NUM_SEQUENCES).
+    """
+    c = changes.astype(np.int32) + 9
+    return ((c[:-3] * NUM_CHANGES + c[1:-2]) * NUM_CHANGES + c[2:-1]) * NUM_CHANGES + c[3:]
+
+def sequence_totals_(prices, changes, totals=None):
+    """ Returns an int64 array of NUM_SEQUENCES totals where totals[code] is the number of bananas
+        sold by all buyers for the sequence of 4 changes with `code`. If `totals` is given, the
+        buyers' sells are added to it in place.
+        Each buyer sells at the first occurrence of a sequence. For each buyer, first[code] is set
+        to the first time `code` occurs with np.minimum.at, then reset after the buyer's sells are
+        added to `totals`, so `first` is the only other NUM_SEQUENCES array.
+    """
+    codes = np.ascontiguousarray(sequence_codes_(changes).T)
+    sells = np.ascontiguousarray(prices[4:].T)
+    unseen = np.iinfo(np.int32).max
+    first = np.full(NUM_SEQUENCES, unseen, dtype=np.int32)
+    times = np.arange(codes.shape[1], dtype=np.int32)
+    if totals is None: totals = np.zeros(NUM_SEQUENCES, dtype=np.int64)
+    for buyer_codes, buyer_sells in zip(codes, sells):
+        np.minimum.at(first, buyer_codes, times)
+        is_first = first[buyer_codes] == times
+        totals[buyer_codes[is_first]] += buyer_sells[is_first]
+        first[buyer_codes] = unseen
+    return totals
+
+def max_num_bananas_(prices, changes):
     "Find the sequence of 4 changes that will maximize the number of bananas."
-    seq_nums = {}
-
-    for i, line_prices in enumerate(banana_prices):
-        changes = [line_prices[i].change for i in range(3)]
-        for banana in line_prices[3:]:
-            changes.append(banana.change)
-            seq = Sequence(changes)
-            if seq not in seq_nums: seq_nums[seq] = [0] * len(banana_prices)
-            if seq_nums[seq][i] == 0: seq_nums[seq][i] = banana.num
-            changes = changes[1:]
-
-    return max([sum(v) for v in seq_nums.values()])
-
-def run_monkey_market(lines, func_prices, func_numbers) :
-    """Run the monkey market simulation for each line in `lines` and write the results to the
-        functions `func_prices` and `func_numbers`.
+    return int(sequence_totals_(prices, changes).max())
+
+def seeds_(lines):
+    "Returns a uint32 array of the buyers' initial secret numbers in `lines`."
+    return np.array([number_(line) for line in lines], dtype=np.uint32)
+
+def run_monkey_market(lines, num_secrets=NUM_SECRETS):
+    """ Run the monkey market simulation for all the buyers in `lines` at once.
+        Returns `secrets`, `prices`, `changes` where
+        - secrets is a uint32 array of each buyer's last secret number
+        - prices is an int8 (num_secrets + 1, buyers) array of the prices, including the initial price
+        - changes is an int8 (num_secrets, buyers) array of the price changes
     """
-    for line in lines:
+    return simulate_market(seeds_(lines), num_secrets)
+
+def simulate_market(seeds, num_secrets=NUM_SECRETS):
+    "Run the monkey market simulation for the buyers with initial secret numbers `seeds`."
+    secrets = seeds.astype(np.uint32)
+    prices = np.empty((num_secrets + 1, len(secrets)), dtype=np.int8)
+    prices[0] = secrets % 10
+    for k in range(1, num_secrets + 1):
+        next_secrets_(secrets)
+        prices[k] = secrets % 10
+    changes = np.diff(prices, axis=0)
+    return secrets, prices, changes
+
+# Parallel sharded market.
+# The buyers are split into one shard per worker process. Each worker simulates its shard in blocks
+# of BLOCK_BUYERS buyers and adds their sells to its own row of a (shards, NUM_SEQUENCES) totals
+# array in shared memory, so the totals are never pickled. Only the part 1 sums go through the pool
+# and the parent reduces the rows with a single sum.
+
+BLOCK_BUYERS = 2000             # Buyers simulated at once. Bounds the prices and codes arrays.
+MIN_PARALLEL_BUYERS = 10000     # Fewer buyers than this are simulated in the main process.
+
+worker_shm = None
+worker_totals = None
+
+def init_worker(name, num_shards):
+    "Pool initializer: Attach this process to the shared totals array called `name`."
+    global worker_shm, worker_totals
+    worker_shm = shared_memory.SharedMemory(name=name)
+    worker_totals = np.ndarray((num_shards, NUM_SEQUENCES), dtype=np.int64, buffer=worker_shm.buf)
+
+def market_shard_(seeds, totals):
+    "Simulate the buyers in `seeds`, add their sells to `totals` and return their secret sum."
+    secret_sum = 0
+    for i in range(0, len(seeds), BLOCK_BUYERS):
+        secrets, prices, changes = simulate_market(seeds[i:i + BLOCK_BUYERS])
+        secret_sum += int(secrets.sum(dtype=np.int64))
+        sequence_totals_(prices, changes, totals)
+    return secret_sum
+
+def run_market_shard(shard, seeds):
+    "Simulate shard number `shard` into its row of the shared totals array."
+    return market_shard_(seeds, worker_totals[shard])
+
+def run_market_parallel(seeds, processes=None):
+    """ Returns the sum of the last secret numbers and the NUM_SEQUENCES sequence totals of the
+        buyers in `seeds`, simulated over a pool of `processes` processes (default: all cores).
+    """
+    processes = pool_processes_(len(seeds), MIN_PARALLEL_BUYERS, processes)
+    if processes == 1:
+        totals = np.zeros(NUM_SEQUENCES, dtype=np.int64)
+        return market_shard_(seeds, totals), totals
+    shards = np.array_split(seeds, processes)
+    shm = shared_memory.SharedMemory(create=True, size=processes * NUM_SEQUENCES * 8)
+    try:
+        shard_totals = np.ndarray((processes, NUM_SEQUENCES), dtype=np.int64, buffer=shm.buf)
+        shard_totals[:] = 0
+        with fork_pool(processes, init_worker, (shm.name, processes)) as pool:
+            secret_sums = pool.starmap(run_market_shard, enumerate(shards))
+        totals = shard_totals.sum(axis=0)
+        del shard_totals
+    finally:
+        shm.close()
+        shm.unlink()
+    return sum(secret_sums), totals
+
+def test1():
+    "Test the vectorised secret number generator against the example and `secret_number_`."
+    expected = [15887950, 16495136, 527345, 704524, 1553684, 12683156, 11100544, 12249484, 7753432, 5908254]
+    secrets = np.array([123], dtype=np.uint32)
+    actual = [int(next_secrets_(secrets)[0]) for _ in expected]
+    assert actual == expected, f"Expected {expected}, got {actual}"
+
+    lines = [str(n) for n in [1, 10, 100, 2024, 123, 0xFFFFFF]]
+    secrets, prices, _ = run_monkey_market(lines)
+    for i, line in enumerate(lines):
         n = number_(line)
-        prev = n % 10
-        line_prices = []
-        for _ in range(2000):
+        for k in range(1, NUM_SECRETS + 1):
             n = secret_number_(n)
-            line_prices.append(BananaPrice.from_previous(n, prev))
-            prev = n % 10
-        func_prices(line_prices)
-        func_numbers(n)
-
-def part1(lines):
-    "Solution to part 1. (20506453102)"
-    secret_sum = [0]
-    def add_prices(line_prices): pass
-    def add_number(n): secret_sum[0] += n
-    run_monkey_market(lines, add_prices, add_number)
-    print(f"Part 1. Sum of secret numbers is {secret_sum[0]}")
-
-def part2(grid):
-    "Solution to part 2. (2423)"
-    banana_prices = []
-    def add_prices(line_prices): banana_prices.append(line_prices)
-    def add_number(n): pass
-    run_monkey_market(lines, add_prices, add_number)
-    max_num_bananas = max_num_bananas_(banana_prices)
+            assert prices[k, i] == n % 10, f"Buyer {line} secret {k}: Expected price {n % 10}, got {prices[k, i]}"
+        assert secrets[i] == n, f"Buyer {line}: Expected {n}, got {secrets[i]}"
+    print(f"Test passed: {len(lines)} buyers")
+
+    _, prices, changes = run_monkey_market(["1", "2", "3", "2024"])
+    totals = sequence_totals_(prices, changes)
+    code = int(sequence_codes_(np.array([[-2], [1], [-1], [3]], dtype=np.int8))[0, 0])
+    assert totals[code] == 23 and totals.max() == 23, f"Expected 23, got {totals[code]} {totals.max()}"
+    print(f"Test passed: {totals.max()} bananas")
+
+    seeds = np.arange(1, MIN_PARALLEL_BUYERS + 1, dtype=np.uint32)
+    totals = np.zeros(NUM_SEQUENCES, dtype=np.int64)
+    expected = market_shard_(seeds, totals), totals
+    secret_sum, totals = run_market_parallel(seeds, processes=3)
+    assert secret_sum == expected[0], f"Expected {expected[0]}, got {secret_sum}"
+    assert np.array_equal(totals, expected[1]), "Sharded totals differ"
+    print(f"Test passed: {len(seeds)} buyers in 3 shards")
+
+def part1(lines, market=None):
+    """ Solution to part 1. 37327623 for the test input. (20506453102)
+        `market` is the result of `run_market_parallel` if it has already been run.
+    """
+    if market:
+        secret_sum, _ = market
+    else:
+        secrets, _, _ = run_monkey_market(lines)
+        secret_sum = int(secrets.sum(dtype=np.int64))
+    print(f"Part 1. Sum of secret numbers is {secret_sum}")
+
+def part2(lines, market=None):
+    """ Solution to part 2. 23 for 1, 2, 3, 2024. (2423)
+        `market` is the result of `run_market_parallel` if it has already been run.
+    """
+    if market:
+        _, totals = market
+        max_num_bananas = int(totals.max())
+    else:
+        _, prices, changes = run_monkey_market(lines)
+        max_num_bananas = max_num_bananas_(prices, changes)
     print(f"Part 2: Most bananas is {max_num_bananas}")
 
 args = parse_args("Advent of Code 2024 - Day 22", "problems/aoc2024-day22-input.txt")
 
+if args.testing:
+    test1()
+    exit()
+
 lines = read_lines(args.input)
 
 t0 = time.time()
-part1(lines)
+market = run_market_parallel(seeds_(lines)) if args.optimise else None
+part1(lines, market)
 t1 = time.time() - t0
 t0 = time.time()
-part2(lines)
+part2(lines, market)
 t2 = time.time() - t0
 print(f"Part 1: {t1:.1f} sec")
 print(f"Part 2: {t2:.1f} sec")
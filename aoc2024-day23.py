@@ -108,8 +108,13 @@
     What is the password to get into the LAN party?
 """
 import time
+import random
+import string
+from array import array
+from itertools import combinations
 from collections import defaultdict
-from typing import List, Dict, Set, Tuple
+from typing import List, Dict, Set, Tuple, Iterable
+import numpy as np
 from common import read_lines, parse_args
 
 def graph_(lines: List[str]) -> Dict[str, Set[str]]:
@@ -121,74 +126,186 @@ def graph_(lines: List[str]) -> Dict[str, Set[str]]:
         graph[key2].add(key1)
     return graph
 
-def triplets_(graph: Dict[str, Set[str]]) -> Set[Tuple[str, str, str]]:
-    "Return the set of triplets of connected computers"
-    triplets = set()
-    for key1, adjacents in graph.items():
-        if len(adjacents) < 2: continue
-        for key2 in adjacents:
-            for key3 in adjacents:
-                if key2 == key3: continue
-                if key3 in graph[key2]:
-                    triplets.add(tuple(sorted([key1, key2, key3])))
-    return triplets
-
-def num_t_triplets_(triplets: Set[Tuple[str, str, str]]) -> int:
-    "Return the number of triplets that contain a computer starting with 't'"
-    return sum(1 for trip in triplets if any(key.startswith('t') for key in trip))
-
-def bron_kerbosch(R: Set[str],
-                  P: Set[str],
-                  X: Set[str],
-                  graph: Dict[str, Set[str]],
-                  cliques: List[Set[str]]) -> None:
+def edge_ids_(lines: Iterable[str]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """ Stream the "a-b" connections in `lines`, which may be a file, into integer vertex ids.
+        Returns `names`, `u`, `v` where names[i] is the name of vertex i and u[k]-v[k] is the
+        k'th connection.
     """
-    Bron-Kerbosch algorithm to find all maximal cliques in an undirected graph.
-
-    Parameters:
-    - R: Set of vertices in the current clique.
-    - P: Set of vertices that are candidates to be added to the clique.
-    - X: Set of vertices that are already processed and should not be added.
-    - graph: Dictionary representation of the adjacency list of the graph.
-    - cliques: List to store all maximal cliques.
+    ids = {}
+    ends = array("i")
+    for line in lines:
+        line = line.strip()
+        if not line: continue
+        key1, key2 = line.split('-')
+        ends.append(ids.setdefault(key1, len(ids)))
+        ends.append(ids.setdefault(key2, len(ids)))
+    ends = np.frombuffer(ends, dtype=np.int32).reshape(-1, 2)
+    return list(ids), ends[:, 0], ends[:, 1]
+
+def forward_edges_(u: np.ndarray, v: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Returns `rank`, `keys` for the undirected connections u[k]-v[k] between `n` vertices.
+        Vertices are ranked by (degree, id) and each connection is oriented from its lower to its
+        higher ranked vertex. keys is the sorted array of the distinct oriented connections a->b
+        coded as a * n + b with a, b ranks, so a vertex has at most sqrt(2 * edges) forward
+        neighbours.
     """
-    if not P and not X:
-        cliques.append(R)
-        return
-
-    for v in list(P):
-        bron_kerbosch(R.union({v}), P.intersection(graph[v]), X.intersection(graph[v]), graph, cliques)
-        P.remove(v)
-        X.add(v)
-
-def bron_kerbosch_with_pivot(R: Set[str],
-                             P: Set[str],
-                             X: Set[str],
-                             graph: Dict[str, Set[str]],
-                             cliques: List[Set[str]]) -> None:
-    """ Bron-Kerbosch algorithm with pivot to find all maximal cliques in an undirected graph.
-       This version selects a pivot vertex to reduce the number of recursive calls.
+    u, v = u.astype(np.int64), v.astype(np.int64)
+    keys = np.minimum(u, v) * n + np.maximum(u, v)
+    keys = np.unique(keys[u != v])
+    degree = np.bincount(keys // n, minlength=n) + np.bincount(keys % n, minlength=n)
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.lexsort((np.arange(n), degree))] = np.arange(n)
+    a, b = rank[keys // n], rank[keys % n]
+    return rank, np.sort(np.minimum(a, b) * n + np.maximum(a, b))
+
+WEDGE_BLOCK = 1 << 22   # Wedges checked at once. Bounds the memory used by `count_triangles_`.
+
+def count_triangles_(lines: Iterable[str], prefix: str = "t") -> Tuple[int, int]:
+    """ Returns the number of triangles of connected computers in `lines` and the number of them
+        with a computer whose name starts with `prefix`.
+        Each triangle a < b < c in rank order has forward edges a->b, a->c and b->c. For each forward
+        edge a->b, the wedges a->c with c after b in a's sorted forward neighbours are closed if b->c
+        is in `keys`, which intersects the forward neighbours of a and b with a binary search.
+    """
+    names, u, v = edge_ids_(lines)
+    n = len(names)
+    rank, keys = forward_edges_(u, v, n)
+    has_prefix = np.zeros(n, dtype=bool)
+    has_prefix[rank] = [name.startswith(prefix) for name in names]
+    src, dst = keys // n, keys % n
+    end = np.cumsum(np.bincount(src, minlength=n))[src]  # End of each edge's forward neighbours.
+    num_wedges = end - np.arange(len(keys)) - 1
+    cum_wedges = np.cumsum(num_wedges)
+
+    num_triangles, num_prefix_triangles = 0, 0
+    e0 = 0
+    while e0 < len(keys):
+        limit = cum_wedges[e0] - num_wedges[e0] + WEDGE_BLOCK
+        e1 = max(int(np.searchsorted(cum_wedges, limit, side="right")), e0 + 1)
+        counts = num_wedges[e0:e1]
+        edges = np.repeat(np.arange(e0, e1), counts)
+        offsets = np.arange(len(edges)) - np.repeat(np.cumsum(counts) - counts, counts)
+        a, b, c = src[edges], dst[edges], dst[edges + 1 + offsets]
+        wedge_keys = b * n + c
+        pos = np.minimum(np.searchsorted(keys, wedge_keys), len(keys) - 1)
+        closed = keys[pos] == wedge_keys
+        num_triangles += int(closed.sum())
+        num_prefix_triangles += int((closed & (has_prefix[a] | has_prefix[b] | has_prefix[c])).sum())
+        e0 = e1
+    return num_triangles, num_prefix_triangles
+
+def bits_(bitset: int):
+    "Yield the indexes of the set bits in `bitset`, lowest first."
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+class BitGraph:
+    """ An undirected graph with its vertices remapped to integer ids 0..n-1.
+        names[i] is the name of vertex i and bit j of adjacency[i] is set if i and j are connected.
     """
-    if not P and not X:
-        cliques.append(R)
-        return
+    def __init__(self, graph: Dict[str, Set[str]]):
+        self.names = sorted(graph)
+        ids = {name: i for i, name in enumerate(self.names)}
+        self.adjacency = [sum(1 << ids[key] for key in graph[name]) for name in self.names]
 
-    pivot = next(iter(P.union(X)))  # Select a pivot vertex
-    for v in P - graph[pivot]:  # Iterate over vertices not adjacent to the pivot
-        bron_kerbosch_with_pivot(R.union({v}), P.intersection(graph[v]), X.intersection(graph[v]), graph, cliques)
-        P.remove(v)
-        X.add(v)
+    def degeneracy_order(self) -> List[int]:
+        """ Returns the vertex ids in degeneracy order: each vertex is a vertex of minimum degree in
+            the graph left after removing the vertices before it. Uses a bucket queue of degrees.
+        """
+        degrees = [adj.bit_count() for adj in self.adjacency]
+        buckets = [set() for _ in range(max(degrees, default=0) + 1)]
+        for v, d in enumerate(degrees): buckets[d].add(v)
+        removed = 0
+        order = []
+        d = 0
+        for _ in range(len(degrees)):
+            d = max(d - 1, 0)
+            while not buckets[d]: d += 1
+            v = buckets[d].pop()
+            order.append(v)
+            removed |= 1 << v
+            for u in bits_(self.adjacency[v] & ~removed):
+                buckets[degrees[u]].remove(u)
+                degrees[u] -= 1
+                buckets[degrees[u]].add(u)
+        return order
+
+    def max_clique(self) -> List[int]:
+        """ Returns the ids of a largest clique.
+            Each vertex v is taken in degeneracy order and pivoted Bron-Kerbosch searches for cliques
+            containing v among its later neighbours P, excluding its earlier neighbours X. Branches
+            that can't beat the best clique found so far, |R| + |P| <= |best|, are cut.
+        """
+        adjacency = self.adjacency
+        best = []
+
+        def expand(R: List[int], P: int, X: int) -> None:
+            nonlocal best
+            if not P:
+                if not X and len(R) > len(best): best = R.copy()
+                return
+            if len(R) + P.bit_count() <= len(best): return
+            pivot = max(bits_(P | X), key=lambda u: (P & adjacency[u]).bit_count())
+            for v in bits_(P & ~adjacency[pivot]):
+                if len(R) + P.bit_count() <= len(best): return
+                R.append(v)
+                expand(R, P & adjacency[v], X & adjacency[v])
+                R.pop()
+                P &= ~(1 << v)
+                X |= 1 << v
+
+        earlier = 0
+        for v in self.degeneracy_order():
+            P = adjacency[v] & ~earlier
+            if 1 + P.bit_count() > len(best):
+                expand([v], P, adjacency[v] & earlier)
+            earlier |= 1 << v
+        return best
 
 def max_clique_(graph: Dict[str, Set[str]]) -> List[str]:
     "Return the largest clique in the graph."
-    all_computers = set(graph.keys())
-    cliques = []
-    bron_kerbosch(set(), all_computers, set(), graph, cliques)
-    return max(cliques, key=len)
-
-def part1(graph):
-    "Solution to part 1. (1000)"
-    num_t_triplets = num_t_triplets_(triplets_(graph))
+    bit_graph = BitGraph(graph)
+    return [bit_graph.names[v] for v in bit_graph.max_clique()]
+
+def test1():
+    "Test the triangle counter and clique engine on the example and random graphs."
+    with open("problems/aoc2024-day23-input-test.txt") as f:
+        counts = count_triangles_(f)
+    assert counts == (12, 7), f"Expected (12, 7), got {counts}"
+    print(f"Test passed: {counts[0]} triangles, {counts[1]} with t")
+
+    rng = random.Random(41)
+    names = [f"{a}{b}" for a in "tuvwxyz" for b in string.ascii_lowercase]
+    lines = [f"{rng.choice(names)}-{rng.choice(names)}" for _ in range(1500)]
+    graph = graph_([line for line in lines if line[:2] != line[3:]])
+    triangles = [t for t in combinations(sorted(graph), 3)
+                 if t[1] in graph[t[0]] and t[2] in graph[t[0]] and t[2] in graph[t[1]]]
+    expected = len(triangles), sum(any(key.startswith("t") for key in t) for t in triangles)
+    counts = count_triangles_(lines)
+    assert counts == expected, f"Expected {expected}, got {counts}"
+    print(f"Test passed: {counts[0]} triangles, {counts[1]} with t")
+
+    graph = graph_(read_lines("problems/aoc2024-day23-input-test.txt"))
+    password = ",".join(sorted(max_clique_(graph)))
+    assert password == "co,de,ka,ta", f"Expected co,de,ka,ta, got {password}"
+    print(f"Test passed: {password}")
+
+    rng = random.Random(23)
+    names = [f"{a}{b}" for a in string.ascii_lowercase for b in string.ascii_lowercase]
+    lines = [f"{rng.choice(names)}-{rng.choice(names)}" for _ in range(3000)]
+    planted = rng.sample(names, 12)
+    lines += [f"{a}-{b}" for i, a in enumerate(planted) for b in planted[i + 1:]]
+    graph = graph_([line for line in lines if line[:2] != line[3:]])
+    max_clique = max_clique_(graph)
+    assert len(max_clique) == len(planted), f"Expected {len(planted)}, got {len(max_clique)}"
+    assert all(b in graph[a] for a in max_clique for b in max_clique if a != b), "Not a clique"
+    print(f"Test passed: clique of {len(max_clique)} in {len(graph)} computers")
+
+def part1(lines):
+    "Solution to part 1. 7 for the test input. (1000)"
+    _, num_t_triplets = count_triangles_(lines)
     print(f"Part 1: Number of triplets starting with t is {num_t_triplets}")
 
 def part2(graph):
@@ -199,13 +316,16 @@ def part2(graph):
 
 args = parse_args("Advent of Code 2024 - Day 23", "problems/aoc2024-day23-input.txt")
 
-lines = read_lines(args.input)
-graph = graph_(lines)
+if args.testing:
+    test1()
+    exit()
 
 t0 = time.time()
-part1(graph)
+with open(args.input) as f:
+    part1(f)
 t1 = time.time() - t0
 t0 = time.time()
+graph = graph_(read_lines(args.input))
 part2(graph)
 t2 = time.time() - t0
 print(f"Part 1: {t1:.1f} sec")
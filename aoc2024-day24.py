@@ -239,8 +239,11 @@
     wires involved in a swap and then join those names with commas?
 
 """
+import os
 import time
-from common import parse_args, read_lines, number_, concat
+import random
+import operator
+from common import parse_args, read_lines, number_
 
 
 def split_input(lines):
@@ -261,42 +264,117 @@ def connections_(gate_vals):
         connections.setdefault(b, []).append((a, gate, o))
     return connections
 
-def wires_to_number(wire_vals, wires):
-    binary = concat(str(wire_vals[wire]) for wire in sorted(wires, reverse=True))
-    return int(binary, 2)
-
-# Evaluate the gate operations
-def apply_gate(wire_vals, a, gate, b, o):
-    "Apply the gate operation to the wire values."
-    if gate == "AND":   wire_vals[o] = wire_vals[a] & wire_vals[b]
-    elif gate == "OR":  wire_vals[o] = wire_vals[a] | wire_vals[b]
-    elif gate == "XOR": wire_vals[o] = wire_vals[a] ^ wire_vals[b]
-
-# Evaluate the wires
-def evaluate_wires(wire_vals, connections):
-    wires = list(wire_vals.keys())
-    visited = set()
-
-    while wires:
-        wire = wires.pop(0)
-        if wire in visited or wire not in connections: continue
-
-        if wire not in wire_vals:
-            wires.append(wire)
-            continue
-
-        is_connected = False
-        for a, gate, b in connections[wire]:
-            if a not in wire_vals: continue
-            is_connected = True
-            apply_gate(wire_vals, wire, gate, a, b)
-            if b not in visited: wires.append(b)
-
-        if not is_connected:
-            wires.append(wire)
-            continue
-
-        visited.add(wire)
+# Compiled circuit.
+# The gates are sorted topologically once into instructions (op, a, b, o) over integer wire ids, so
+# evaluation is a single pass in which every gate's inputs are ready. The same pass evaluates a
+# bytearray of 0/1 wire values or a list of Python ints whose bits are lanes, each lane being an
+# independent (x, y) input.
+
+OPERATORS = [operator.and_, operator.or_, operator.xor]
+OP_CODES = {"AND": 0, "OR": 1, "XOR": 2}
+
+def swap_outputs_(gate_vals, swaps):
+    "Returns `gate_vals` with the output wires in each pair in `swaps` swapped."
+    swapped = {}
+    for o1, o2 in swaps: swapped[o1], swapped[o2] = o2, o1
+    return [(a, gate, b, swapped.get(o, o)) for a, gate, b, o in gate_vals]
+
+def bit_wires_(names, prefix):
+    "Returns the names in `names` starting with `prefix`, least significant bit first."
+    return sorted(name for name in names if name.startswith(prefix))
+
+class Circuit:
+    """ A gate netlist compiled into topologically sorted instructions.
+        wires[i] is the name of wire i. The undriven input wires come first.
+        x_ids, y_ids and z_ids are the ids of the x, y and z wires, least significant bit first.
+        `swaps` is a list of pairs of gate output wires to swap before compiling.
+        Raises ValueError if the gates contain a loop. `evaluate` raises ValueError if an input wire
+        has no initial value.
+    """
+    def __init__(self, gate_vals, swaps=()):
+        gates = swap_outputs_(gate_vals, swaps)
+        outputs = {o for _, _, _, o in gates}
+        inputs = sorted({w for a, _, b, _ in gates for w in (a, b)} - outputs)
+        self.wires = inputs + sorted(outputs)
+        self.num_inputs = len(inputs)
+        ids = {wire: i for i, wire in enumerate(self.wires)}
+        self.x_ids = [ids[w] for w in bit_wires_(inputs, "x")]
+        self.y_ids = [ids[w] for w in bit_wires_(inputs, "y")]
+        self.z_ids = [ids[w] for w in bit_wires_(outputs, "z")]
+
+        # Kahn's algorithm: a gate is ready when both its inputs have values.
+        readers = [[] for _ in self.wires]
+        num_pending = []
+        ready = []
+        for g, (a, _, b, _) in enumerate(gates):
+            pending = [w for w in (a, b) if w in outputs]
+            for w in pending: readers[ids[w]].append(g)
+            num_pending.append(len(pending))
+            if not pending: ready.append(g)
+        self.program = []
+        for g in ready:     # `ready` grows as gates are compiled.
+            a, gate, b, o = gates[g]
+            self.program.append((OP_CODES[gate], ids[a], ids[b], ids[o]))
+            for r in readers[ids[o]]:
+                num_pending[r] -= 1
+                if num_pending[r] == 0: ready.append(r)
+        if len(self.program) != len(gates):
+            raise ValueError(f"Circuit has a loop: {len(gates) - len(self.program)} gates can't be evaluated")
+        self.instructions = [(OPERATORS[op], a, b, o) for op, a, b, o in self.program]
+
+    def run(self, values):
+        "Evaluate the instructions over `values`, a bytearray of wire bits or a list of lane ints."
+        for op, a, b, o in self.instructions:
+            values[o] = op(values[a], values[b])
+        return values
+
+    def evaluate(self, wire_vals):
+        "Returns the wire values for the initial `wire_vals` as a bytearray indexed by wire id."
+        missing = [wire for wire in self.wires[:self.num_inputs] if wire not in wire_vals]
+        if missing:
+            raise ValueError(f"Input wires have no value: {', '.join(missing)}")
+        values = bytearray(len(self.wires))
+        for i, wire in enumerate(self.wires):
+            if wire in wire_vals: values[i] = wire_vals[wire]
+        return self.run(values)
+
+    def z_number(self, wire_vals):
+        "Returns the number on the z wires for the initial `wire_vals`."
+        values = self.evaluate(wire_vals)
+        return sum(values[i] << bit for bit, i in enumerate(self.z_ids))
+
+    def run_lanes(self, x_lanes, y_lanes):
+        """ Bit-sliced evaluation. x_lanes[i] and y_lanes[i] are ints whose bit k is bit i of the
+            k'th x and y inputs. Returns z_lanes where bit k of z_lanes[j] is bit j of the k'th output.
+        """
+        values = [0] * len(self.wires)
+        for ids, lanes in (self.x_ids, x_lanes), (self.y_ids, y_lanes):
+            for i, lane in zip(ids, lanes): values[i] = lane
+        self.run(values)
+        return [values[i] for i in self.z_ids]
+
+    def add_many(self, xs, ys):
+        "Returns the z numbers for the (x, y) inputs in `xs` and `ys`, evaluated in one pass."
+        z_lanes = self.run_lanes(to_lanes_(xs, len(self.x_ids)), to_lanes_(ys, len(self.y_ids)))
+        return from_lanes_(z_lanes, len(xs))
+
+def to_lanes_(numbers, num_bits):
+    "Returns `lanes` where bit k of lanes[i] is bit i of numbers[k]."
+    lanes = [0] * num_bits
+    for k, n in enumerate(numbers):
+        for i in range(min(n.bit_length(), num_bits)):
+            if n >> i & 1: lanes[i] |= 1 << k
+    return lanes
+
+def from_lanes_(lanes, num_numbers):
+    "Returns `numbers` where bit i of numbers[k] is bit k of lanes[i]."
+    numbers = [0] * num_numbers
+    for i, lane in enumerate(lanes):
+        while lane:
+            low = lane & -lane
+            numbers[low.bit_length() - 1] |= 1 << i
+            lane ^= low
+    return numbers
 
 # Ripple-carry adder rules. Based on https://www.reddit.com/r/adventofcode/comments/1hla5ql/2024_day_24_part_2_a_guide_on_the_idea_behind_the/
 # The ripple-carry adder is a digital circuit that adds two binary numbers. It consists of a chain
@@ -364,13 +442,143 @@ def ripple_carry_adder_violations(gate_vals, connections, verbose=False):
 
     return wrong_outputs
 
-def part1(wire_vals, connections):
-    "Solution to part 1. (58639252480880)"
-    evaluate_wires(wire_vals, connections)
-    z_wires = [wire for wire in wire_vals if wire.startswith("z")]
-    z_number = wires_to_number(wire_vals, z_wires)
+# Adder verification.
+# The circuit is checked against true addition for many (x, y) inputs in one bit-sliced pass of
+# `Circuit.run_lanes`. The structured inputs exercise every bit and carry chain and the random
+# inputs catch the rest. This works for any circuit, not only ripple-carry adders, and localises
+# faults to the lowest z bits that disagree.
+
+NUM_RANDOM_VECTORS = 256
+
+def adder_vectors_(num_bits, num_random=NUM_RANDOM_VECTORS, seed=24):
+    "Returns `xs`, `ys`: structured and random `num_bits` inputs to test an adder with."
+    top = (1 << num_bits) - 1
+    pairs = [(0, 0), (top, 0), (0, top), (top, top), (top, 1), (1, top)]
+    for i in range(num_bits):
+        bit = 1 << i
+        pairs += [(bit, 0), (0, bit), (bit, bit), (bit - 1, 1), (top ^ bit, bit)]
+    rng = random.Random(seed)
+    pairs += [(rng.getrandbits(num_bits), rng.getrandbits(num_bits)) for _ in range(num_random)]
+    xs, ys = zip(*pairs)
+    return list(xs), list(ys)
+
+def lane_indexes_(lane):
+    "Returns the indexes of the set bits in `lane`."
+    return [k for k in range(lane.bit_length()) if lane >> k & 1]
+
+def adder_faults_(circuit, xs=None, ys=None):
+    """ Returns `faults`, a dict that maps each z bit that disagrees with x + y for some of the (x, y)
+        inputs to the indexes of those inputs. The lowest key is the first faulty bit.
+        The default inputs are `adder_vectors_` for the circuit's x width.
+    """
+    if xs is None: xs, ys = adder_vectors_(len(circuit.x_ids))
+    z_lanes = circuit.run_lanes(to_lanes_(xs, len(circuit.x_ids)), to_lanes_(ys, len(circuit.y_ids)))
+    expected = to_lanes_([x + y for x, y in zip(xs, ys)], len(z_lanes))
+    faults = {}
+    for bit, (z, e) in enumerate(zip(z_lanes, expected)):
+        if z != e: faults[bit] = lane_indexes_(z ^ e)
+    return faults
+
+def pairings_(wires):
+    "Yield every way of splitting `wires`, an even length list, into pairs."
+    if not wires:
+        yield []
+        return
+    first, rest = wires[0], wires[1:]
+    for i, other in enumerate(rest):
+        for pairs in pairings_(rest[:i] + rest[i + 1:]):
+            yield [(first, other)] + pairs
+
+def confirm_swaps(gate_vals, wires):
+    """ Returns the pairs of `wires` whose output swaps make the circuit add correctly for all
+        `adder_vectors_`, or None if no pairing does.
+    """
+    for swaps in pairings_(sorted(wires)):
+        try:
+            circuit = Circuit(gate_vals, swaps)
+        except ValueError:
+            continue
+        if not adder_faults_(circuit): return swaps
+    return None
+
+def test1():
+    "Test the compiled circuit on the examples and on a generated ripple-carry adder."
+    wire_lines, gate_lines = split_input(read_lines("problems/aoc2024-day24-input-test.txt"))
+    wire_vals, gate_vals = wire_vals_(wire_lines), gate_vals_(gate_lines)
+    z_number = Circuit(gate_vals).z_number(wire_vals)
+    assert z_number == 2024, f"Expected 2024, got {z_number}"
+    print(f"Test passed: {z_number}")
+
+    gate_vals = ripple_carry_adder_(8)
+    circuit = Circuit(gate_vals)
+    xs, ys = list(range(256)) * 256, [y for y in range(256) for _ in range(256)]
+    zs = circuit.add_many(xs, ys)
+    assert zs == [x + y for x, y in zip(xs, ys)], "Ripple-carry adder gave a wrong sum"
+    wire_vals = {f"x{i:02d}": 173 >> i & 1 for i in range(8)} | {f"y{i:02d}": 91 >> i & 1 for i in range(8)}
+    assert circuit.z_number(wire_vals) == 173 + 91, "Ripple-carry adder gave a wrong sum"
+    print(f"Test passed: {len(zs)} sums in one pass")
+
+    try:
+        Circuit(gate_vals, [("s01", "z01")])  # s01 XOR c00 -> s01
+        assert False, "Expected a loop"
+    except ValueError as e:
+        print(f"Test passed: {e}")
+
+    try:
+        circuit.z_number({wire: val for wire, val in wire_vals.items() if wire != "y03"})
+        assert False, "Expected a missing input"
+    except ValueError as e:
+        print(f"Test passed: {e}")
+
+def ripple_carry_adder_(num_bits):
+    "Returns the gates of a `num_bits` ripple-carry adder in random order, in gate_vals_ format."
+    gates = [("x00", "XOR", "y00", "z00"), ("x00", "AND", "y00", "c00")]
+    for i in range(1, num_bits):
+        x, y, c = f"x{i:02d}", f"y{i:02d}", f"c{i-1:02d}"
+        gates += [(x, "XOR", y, f"s{i:02d}"), (x, "AND", y, f"a{i:02d}"),
+                  (f"s{i:02d}", "XOR", c, f"z{i:02d}"), (c, "AND", f"s{i:02d}", f"p{i:02d}"),
+                  (f"a{i:02d}", "OR", f"p{i:02d}", f"c{i:02d}" if i < num_bits - 1 else f"z{num_bits:02d}")]
+    random.Random(num_bits).shuffle(gates)
+    return gates
+
+def test2():
+    "Test the adder verification on a 45-bit ripple-carry adder with swapped outputs."
+    gate_vals = ripple_carry_adder_(45)
+    assert not adder_faults_(Circuit(gate_vals)), "Expected no faults"
+    swaps = [("z07", "p07"), ("s13", "a13"), ("c21", "z21"), ("p30", "a30")]
+    faulty = swap_outputs_(gate_vals, swaps)
+    faults = adder_faults_(Circuit(faulty))
+    assert min(faults) == 7, f"Expected first faulty bit 7, got {min(faults)}"
+    print(f"Test passed: faulty bits {sorted(faults)}")
+
+    wires = [w for pair in swaps for w in pair]
+    confirmed = confirm_swaps(faulty, wires)
+    assert confirmed and {frozenset(p) for p in confirmed} == {frozenset(p) for p in swaps}, \
+        f"Expected {swaps}, got {confirmed}"
+    print(f"Test passed: confirmed swaps {confirmed}")
+
+def part1(wire_vals, gate_vals):
+    "Solution to part 1. 2024 for the test input. (58639252480880)"
+    z_number = Circuit(gate_vals).z_number(wire_vals)
     print(f"Part 1: z wires number = {z_number}")
 
+def test3(filename):
+    """ Test the part 2 answer for the puzzle input in `filename` by checking the circuit against true
+        addition before and after swapping the incorrect outputs.
+    """
+    if not os.path.exists(filename):
+        print(f"Skipped part 2 verification: no {filename}")
+        return
+    _, gate_lines = split_input(read_lines(filename))
+    gate_vals = gate_vals_(gate_lines)
+    wrong_outputs = ripple_carry_adder_violations(gate_vals, connections_(gate_vals))
+    faults = adder_faults_(Circuit(gate_vals))
+    assert faults, "Expected the puzzle circuit to be a faulty adder"
+    print(f"Faulty z bits: {', '.join(f'z{bit:02d} ({len(v)} inputs)' for bit, v in faults.items())}")
+    swaps = confirm_swaps(gate_vals, wrong_outputs) if len(wrong_outputs) % 2 == 0 else None
+    assert swaps, f"No pairing of the incorrect outputs {sorted(wrong_outputs)} gives a correct adder"
+    print(f"Test passed: confirmed swaps {', '.join(f'{a}<->{b}' for a, b in swaps)}")
+
 def part2(gate_vals, connections, verbose=False):
     "Solution to part 2. (bkr,mqh,rnq,tfb,vvr,z08,z28,z39)"
     wrong_outputs = ripple_carry_adder_violations(gate_vals, connections, verbose)
@@ -378,6 +586,13 @@ def part2(gate_vals, connections, verbose=False):
     print(f"Part 2: Incorrect outputs = {answer}")
 
 args = parse_args("Advent of Code 2024 - Day 24", "problems/aoc2024-day24-input.txt")
+
+if args.testing:
+    test1()
+    test2()
+    test3(args.input)
+    exit()
+
 lines = read_lines(args.input)
 wire_lines, connection_lines = split_input(lines)
 wire_vals = wire_vals_(wire_lines)
@@ -385,7 +600,7 @@ gate_vals = gate_vals_(connection_lines)
 connections = connections_(gate_vals)
 
 t0 = time.time()
-part1(wire_vals, connections)
+part1(wire_vals, gate_vals)
 t1 = time.time() - t0
 t0 = time.time()
 part2(gate_vals, connections, args.verbose)
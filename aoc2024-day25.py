@@ -154,60 +154,192 @@
     You nod, and The Historians quickly work to collect their notes into the final set of pages for
     the chronicle.
 """
+import os
+import tempfile
 import time
-from common import  parse_args, read_lines
-
-def heights_is_key_(sequence):
-    "Return the heights of the key or lock and a boolean indicating if it's a key."
-    heights = []
-    is_key = sequence[0][0] == '.'
-    target = '#' if is_key else '.'
-
-    for i in range(len(sequence[0])):
-        for j in range(1, len(sequence)):
-            if sequence[j][i] == target:
-                heights.append(j - 1)
-                break
-
-    return tuple(heights), is_key
-
-def keys_and_locks_(lines):
-    "Return a tuple with the keys and locks."
-    keys, locks = [], []
-    def add_pattern(sequence):
-        heights, is_key = heights_is_key_(sequence)
-        if is_key: keys.append(heights)
-        else:     locks.append(heights)
-
-    sequence = []
-    for line in lines:
-        if not line and sequence:
-            add_pattern(sequence)
-            sequence = []
-        else: sequence.append(line)
-
-    if sequence: add_pattern(sequence)
-
-    return keys, locks
-
-# Check if the key fits the lock
-def is_fits(lock, key): return all(key[i] >= lock[i] for i in range(len(lock)))
-
-# Check all lock and key pairs
-def num_fits_(locks, keys): return sum(1 for lock in locks for key in keys if is_fits(lock, key))
-
-def part1(lines):
-    "Solution to part 1. (3196)"
-    keys, locks = keys_and_locks_(lines)
-    print(f"Part 1: {num_fits_(locks, keys)} lock/key pairs")
+import numpy as np
+from common import  parse_args
+
+# Schematic parsing.
+# The file is read as bytes and everything except the '#' and '.' cells is dropped, so each
+# schematic is the next ROWS * COLUMNS cells. The cells are reshaped into an (n, ROWS, COLUMNS) bool
+# tensor and the heights are where each column first differs from the top row. Files are read
+# CHUNK_SIZE bytes at a time with the cells of a partly read schematic carried to the next chunk.
+
+ROWS, COLUMNS = 7, 5
+FILLED, EMPTY = ord("#"), ord(".")
+CHUNK_SIZE = 1 << 24
+
+def schematic_chunks_(filename, chunk_size=CHUNK_SIZE):
+    "Yield (n, ROWS, COLUMNS) bool tensors, True for '#', of the schematics in `filename`."
+    size = ROWS * COLUMNS
+    rest = np.empty(0, dtype=np.uint8)
+    with open(filename, "rb") as f:
+        while chunk := f.read(chunk_size):
+            data = np.frombuffer(chunk, dtype=np.uint8)
+            cells = np.concatenate([rest, data[(data == FILLED) | (data == EMPTY)]])
+            n = len(cells) // size
+            rest = cells[n * size:]
+            if n: yield (cells[:n * size] == FILLED).reshape(n, ROWS, COLUMNS)
+    assert not len(rest), f"Incomplete schematic at the end of {filename}"
+
+def heights_is_key_(schematics):
+    """ Returns `heights`, `is_key` for an (n, ROWS, COLUMNS) tensor of schematics.
+        heights is an (n, COLUMNS) uint8 array of the lock pin heights or the free space above
+        the keys. is_key is True for keys, which have an empty top row.
+    """
+    changed = schematics[:, 1:, :] != schematics[:, :1, :]
+    return np.argmax(changed, axis=1).astype(np.uint8), ~schematics[:, 0, 0]
+
+def keys_and_locks_(filename, chunk_size=CHUNK_SIZE):
+    "Return the heights of the keys and locks in `filename` as (n, COLUMNS) uint8 arrays."
+    keys, locks = [np.empty((0, COLUMNS), dtype=np.uint8)], [np.empty((0, COLUMNS), dtype=np.uint8)]
+    for schematics in schematic_chunks_(filename, chunk_size):
+        heights, is_key = heights_is_key_(schematics)
+        keys.append(heights[is_key])
+        locks.append(heights[~is_key])
+    return np.concatenate(keys), np.concatenate(locks)
+
+# Lock/key fit counting.
+# Locks and keys are (n, columns) uint8 arrays of heights. A key's heights are the free space above
+# it in each column, so a key fits a lock if key >= lock in every column.
+# Small sets are compared pairwise by broadcasting. Large sets are bucketed by height profile in a
+# histogram with one bin per profile. Suffix sums along each column axis turn the key histogram into
+# the number of keys >= each profile, so counting is O(L + K + buckets), where buckets is
+# (max height + 1) ** columns = 7776 for 5 columns of height 0..5.
+
+MAX_PAIRS = 1 << 24     # Lock/key pairs compared by broadcasting at once.
+
+def num_fits_pairwise_(locks, keys):
+    "Count the fitting lock/key pairs by comparing all pairs, MAX_PAIRS at a time."
+    num_fits = 0
+    block = max(1, MAX_PAIRS // max(1, len(keys)))
+    for i in range(0, len(locks), block):
+        fits = (keys[None, :, :] >= locks[i:i + block, None, :]).all(axis=2)
+        num_fits += int(fits.sum())
+    return num_fits
+
+def profile_histogram_(heights, num_levels):
+    "Returns the number of `heights` rows with each profile as a (num_levels,) * columns array."
+    shape = (num_levels,) * heights.shape[1]
+    codes = np.ravel_multi_index(tuple(heights.T), shape)
+    return np.bincount(codes, minlength=num_levels ** heights.shape[1]).reshape(shape)
+
+def num_fits_histograms_(lock_histogram, key_histogram):
+    "Count the fitting lock/key pairs from histograms of their height profiles."
+    at_least = key_histogram
+    for axis in range(at_least.ndim):
+        at_least = np.flip(np.cumsum(np.flip(at_least, axis), axis=axis), axis)
+    return int((lock_histogram * at_least).sum())
+
+def num_fits_bucketed_(locks, keys):
+    "Count the fitting lock/key pairs by bucketing them by height profile."
+    num_levels = int(max(locks.max(initial=0), keys.max(initial=0))) + 1
+    return num_fits_histograms_(profile_histogram_(locks, num_levels), profile_histogram_(keys, num_levels))
+
+def num_fits_streamed_(filename, chunk_size=CHUNK_SIZE):
+    "Count the fitting lock/key pairs in `filename`, keeping only the profile histograms in memory."
+    lock_histogram = np.zeros((ROWS - 1,) * COLUMNS, dtype=np.int64)
+    key_histogram = np.zeros((ROWS - 1,) * COLUMNS, dtype=np.int64)
+    for schematics in schematic_chunks_(filename, chunk_size):
+        heights, is_key = heights_is_key_(schematics)
+        lock_histogram = lock_histogram + profile_histogram_(heights[~is_key], ROWS - 1)
+        key_histogram = key_histogram + profile_histogram_(heights[is_key], ROWS - 1)
+    return num_fits_histograms_(lock_histogram, key_histogram)
+
+def num_fits_(locks, keys):
+    "Count the lock/key pairs where the key fits the lock."
+    if len(locks) == 0 or len(keys) == 0: return 0
+    locks = np.asarray(locks, dtype=np.uint8).reshape(len(locks), -1)
+    keys = np.asarray(keys, dtype=np.uint8).reshape(len(keys), -1)
+    if len(locks) * len(keys) <= MAX_PAIRS: return num_fits_pairwise_(locks, keys)
+    return num_fits_bucketed_(locks, keys)
+
+def test1():
+    "Test the fit counters on the example and on random locks and keys."
+    locks = [(0, 5, 3, 4, 3), (1, 2, 0, 5, 3)]
+    keys = [tuple(5 - h for h in key) for key in [(5, 0, 2, 1, 3), (4, 3, 4, 0, 2), (3, 0, 2, 0, 1)]]
+    num_fits = num_fits_(locks, keys)
+    assert num_fits == 3, f"Expected 3, got {num_fits}"
+    print(f"Test passed: {num_fits} lock/key pairs")
+    num_fits = num_fits_([], keys), num_fits_(locks, [])
+    assert num_fits == (0, 0), f"Expected no pairs, got {num_fits}"
+
+    rng = np.random.default_rng(25)
+    locks = rng.integers(0, 6, size=(2000, 5), dtype=np.uint8)
+    keys = rng.integers(0, 6, size=(3000, 5), dtype=np.uint8)
+    expected = num_fits_pairwise_(locks, keys)
+    num_fits = num_fits_bucketed_(locks, keys)
+    assert num_fits == expected, f"Expected {expected}, got {num_fits}"
+    print(f"Test passed: {num_fits} lock/key pairs of {len(locks)} x {len(keys)}")
+
+    locks = rng.integers(0, 6, size=(100_000, 5), dtype=np.uint8)
+    keys = rng.integers(0, 6, size=(100_000, 5), dtype=np.uint8)
+    t0 = time.time()
+    num_fits = num_fits_(locks, keys)
+    dt = time.time() - t0
+    expected = num_fits_pairwise_(locks[:100], keys)
+    actual = num_fits_bucketed_(locks[:100], keys)
+    assert actual == expected, f"Expected {expected} for the first 100 locks, got {actual}"
+    actual = num_fits_(rng.permutation(locks), rng.permutation(keys))
+    assert actual == num_fits, f"Expected {num_fits} for shuffled locks and keys, got {actual}"
+    print(f"Test passed: {num_fits} lock/key pairs of {len(locks)} x {len(keys)} in {dt:.2f} sec")
+
+def schematic_text_(heights, is_key):
+    "Returns the schematic text of a lock or key with `heights`."
+    rows = []
+    for y in range(ROWS):
+        if is_key: rows.append("".join("." if y <= h else "#" for h in heights))
+        else:      rows.append("".join("#" if y <= h else "." for h in heights))
+    return "\n".join(rows)
+
+def test2():
+    "Test the schematic parser on the example and on a random file read in small chunks."
+    keys, locks = keys_and_locks_("problems/aoc2024-day25-input-test.txt")
+    assert locks.tolist() == [[0, 5, 3, 4, 3], [1, 2, 0, 5, 3]], f"Unexpected locks {locks.tolist()}"
+    assert (5 - keys).tolist() == [[5, 0, 2, 1, 3], [4, 3, 4, 0, 2], [3, 0, 2, 0, 1]], f"Unexpected keys {keys.tolist()}"
+    print(f"Test passed: {len(locks)} locks, {len(keys)} keys")
+
+    rng = np.random.default_rng(45)
+    heights = rng.integers(0, ROWS - 1, size=(500, COLUMNS))
+    is_key = rng.random(500) < 0.5
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "schematics.txt")
+        with open(filename, "w") as f:
+            f.write("\n\n".join(schematic_text_(h, k) for h, k in zip(heights, is_key)) + "\n")
+        keys, locks = keys_and_locks_(filename, chunk_size=100)
+        assert np.array_equal(keys, heights[is_key]) and np.array_equal(locks, heights[~is_key]), "Heights differ"
+        expected = num_fits_pairwise_(locks, keys)
+        num_fits = num_fits_streamed_(filename, chunk_size=100)
+        assert num_fits == expected, f"Expected {expected}, got {num_fits}"
+        print(f"Test passed: {num_fits} lock/key pairs streamed in 100 byte chunks")
+
+        empty = os.path.join(tmpdir, "empty.txt")
+        open(empty, "w").close()
+        num_fits = num_fits_streamed_(empty)
+        assert num_fits == 0, f"Expected 0 for an empty file, got {num_fits}"
+
+def part1(filename, streamed=False):
+    "Solution to part 1. 3 for the test input. (3196)"
+    if streamed:
+        num_fits = num_fits_streamed_(filename)
+    else:
+        keys, locks = keys_and_locks_(filename)
+        num_fits = num_fits_(locks, keys)
+    print(f"Part 1: {num_fits} lock/key pairs")
 
 def part2(): pass
 
 args = parse_args("Advent of Code 2024 - Day 25", "problems/aoc2024-day25-input.txt")
-lines = read_lines(args.input)
+
+if args.testing:
+    test1()
+    test2()
+    exit()
+
 
 t0 = time.time()
-part1(lines)
+part1(args.input, args.optimise)
 t1 = time.time() - t0
 t0 = time.time()
 part2()
@@ -29,44 +29,67 @@
     Irrelevant characters have again been replaced with . in the above diagram. Within the X, each
     MAS can be written forwards or backwards.
 """
-from common import parse_args, read_rows, char_positions
+import numpy as np
+from common import parse_args, read_rows
 
+# The letters are held in a uint8 array. An occurrence of a word in direction dy, dx is a start cell
+# where the grid shifted by i * (dy, dx) equals letter i for every i, so each direction is a product
+# of shifted comparisons. Rows are taken in bands of BAND_ROWS to bound the memory on large grids.
 
-def part1(rows):
-    "Solution to part 1. 18 for the test input."
-    X, M, A, S = [char_positions(rows, c) for c in "XMAS"]
+DIRECTIONS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if (dy, dx) != (0, 0)]
+BAND_ROWS = 1024
+
+def letter_grid_(rows):
+    "Returns `rows` as an (h, w) uint8 array of character codes."
+    text = "".join("".join(row) for row in rows)
+    return np.frombuffer(text.encode(), dtype=np.uint8).reshape(len(rows), -1)
+
+def count_direction_(grid, word, dy, dx):
+    "Returns the number of occurrences of `word` in `grid` reading in direction `dy`, `dx`."
+    span = len(word) - 1
+    h, w = grid.shape[0] - abs(dy) * span, grid.shape[1] - abs(dx) * span
+    if h <= 0 or w <= 0: return 0
+    y0, x0 = (span if dy < 0 else 0), (span if dx < 0 else 0)
+    total = 0
+    for r0 in range(0, h, BAND_ROWS):
+        n = min(BAND_ROWS, h - r0)
+        match = np.ones((n, w), dtype=bool)
+        for i, c in enumerate(word.encode()):
+            y, x = y0 + r0 + dy * i, x0 + dx * i
+            match &= grid[y:y + n, x:x + w] == c
+        total += int(np.count_nonzero(match))
+    return total
 
-    base_spans = [(0, 1), (1, 0), (1, 1), (1, -1)]
-    spans = base_spans
-    spans += [(-dx, -dy) for dx, dy in base_spans]
-    spans += [(dx, -dy) for dx, dy in base_spans]
-    spans += [(-dx, dy) for dx, dy in base_spans]
-    spans = sorted(set(spans))
+def count_word_(grid, word):
+    "Returns the number of occurrences of `word` in `grid` in all 8 directions."
+    return sum(count_direction_(grid, word, dy, dx) for dy, dx in DIRECTIONS)
 
-    matches = []
-    for y, x in X:
-        for dx, dy in spans:
-            if (y+dx, x+dy) in M and (y+2*dx, x+2*dy) in A and (y+3*dx, x+3*dy) in S:
-                matches.append((y,x))
-    print(f"Part 1: {len(matches)}")
+def count_x_word_(grid, word="MAS"):
+    """ Returns the number of Xs of two diagonals that each read the 3 letter `word`, forwards or
+        backwards, through a shared centre letter.
+    """
+    first, centre, last = word.encode()
+    h, w = grid.shape[0] - 2, grid.shape[1] - 2
+    total = 0
+    for r0 in range(0, max(h, 0), BAND_ROWS):
+        n = min(BAND_ROWS, h - r0)
+        def corner(dy, dx): return grid[r0 + 1 + dy:r0 + 1 + dy + n, 1 + dx:1 + dx + w]
+        def diagonal(a, b): return ((a == first) & (b == last)) | ((a == last) & (b == first))
+        match = corner(0, 0) == centre
+        match &= diagonal(corner(-1, -1), corner(1, 1))
+        match &= diagonal(corner(-1, 1), corner(1, -1))
+        total += int(np.count_nonzero(match))
+    return total
+
+def part1(rows, word="XMAS"):
+    "Solution to part 1. 18 for the test input."
+    n = count_word_(letter_grid_(rows), word)
+    print(f"Part 1: {n}")
 
-def part2(rows):
-    "Solution to part 2. 1 for aoc2024-day3-input-test2.txt."
-    M, A, S = [char_positions(rows, c) for c in "MAS"]
-    matches = []
-    for y, x in A:
-        n = 0
-        for dy, dx in [(-1, -1), (-1, 1)]:
-            is_match = False
-            for (a,b) in [(M,S), (S,M)]:
-                if (y+dy, x+dx) in a and (y-dy, x-dx) in b:
-                    is_match = True
-                    break
-            if is_match:
-                n += 1
-        if n == 2:
-            matches.append((y,x))
-    print(f"Part 2: {len(matches)}")
+def part2(rows, word="MAS"):
+    "Solution to part 2. 9 for the test input."
+    n = count_x_word_(letter_grid_(rows), word)
+    print(f"Part 2: {n}")
 
 args = parse_args("Advent of Code 2024 - Day 4", "problems/aoc2024-day4-input-test.txt")
 rows = read_rows(args.input)
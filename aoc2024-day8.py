@@ -49,71 +49,41 @@ from common import parse_args, read_rows
 
 VERBOSE = False
 
-def antinodes_(img, extend):
-    "Return pairs coordinates of antinodes."
-    w, h = img.shape
-    points = set()
-    for y0 in range(h):
-        for x0 in range(w):
-            if img[y0, x0] != 0:
-                points.add((y0, x0))
-
-    antinodes = set()
-    def add_antinode(y, x):
-        fit = 0 <= y < h and 0 <= x < w
-        if fit:
-            antinodes.add((y, x))
-        return fit
-
-    sorted_points = sorted(points)
-    if VERBOSE:
-        print(f"sorted_points={len(sorted_points)}")
-        for i, p in enumerate(sorted_points):
-            print(f"{i:4}: {p}")
-    pairs = set()
-    for i, p0 in enumerate(sorted_points):
-        for p1 in sorted_points[i+1:]:
-            y0, x0 = p0
-            y1, x1 = p1
-            if y1 < y0:
-                p0, p1 = p1, p0
-            pairs.add((p0, p1))
-
-    sorted_pairs = sorted(pairs)
-    if VERBOSE:
-        print(f"sorted_pairs={len(sorted_pairs)}")
-        for i, p in enumerate(sorted_pairs):
-            print(f"{i:4}: {p}")
-    for (y0, x0), (y1, x1) in sorted(pairs):
-        dy = y1 - y0
-        dx = x1 - x0
-        if dx == 0 or dy == 0:
-            continue
-        elements = []
-        ylo, xlo = y0, x0
-        while True:
-            xlo -= dx
-            ylo -= dy
-            if add_antinode(ylo, xlo):
-                elements.append((ylo, xlo))
-            else:
-                break
-            if not extend:
-                break
-        yhi, xhi = y1, x1
-        while True:
-            xhi += dx
-            yhi += dy
-            if add_antinode(yhi, xhi):
-                elements.append((yhi, xhi))
-            else:
-                break
-            if not extend:
-                break
-        if VERBOSE: print(f"    {[y0,x0]}, {[y1,x1]} -> {elements}")
-    return antinodes
-
-MARK = 9
+def antenna_groups_(rows):
+    "Returns a dict mapping each antenna symbol in `rows` to an (n, 2) array of its (y, x) positions."
+    groups = {}
+    for y, row in enumerate(rows):
+        for x, sym in enumerate(row):
+            if sym.isalpha() or sym.isdigit(): groups.setdefault(sym, []).append((y, x))
+    return {sym: np.array(positions) for sym, positions in groups.items()}
+
+def mark_inside(grid, points):
+    "Set the cells of `grid` at the (y, x) `points` that are inside the grid."
+    h, w = grid.shape
+    inside = (points[:, 0] >= 0) & (points[:, 0] < h) & (points[:, 1] >= 0) & (points[:, 1] < w)
+    grid[points[inside, 0], points[inside, 1]] = True
+
+def antinodes_(groups, shape, extend):
+    """ Returns a bool grid of `shape` with the antinodes of the antennas in `groups` set.
+        The pairs of each group are taken at once with np.triu_indices. Without `extend` the
+        antinodes are one pair difference beyond each antenna. With `extend` the difference is
+        reduced by its gcd and every multiple of it from the first antenna that is in the grid is an
+        antinode, which includes the antennas themselves.
+    """
+    grid = np.zeros(shape, dtype=bool)
+    steps = np.arange(-max(shape), max(shape) + 1)
+    for positions in groups.values():
+        if len(positions) < 2: continue
+        i, j = np.triu_indices(len(positions), k=1)
+        p0, p1 = positions[i], positions[j]
+        d = p1 - p0
+        if not extend:
+            mark_inside(grid, np.concatenate([p0 - d, p1 + d]))
+        else:
+            d //= np.gcd(d[:, 0], d[:, 1])[:, None]
+            points = p0[:, None, :] + steps[None, :, None] * d[:, None, :]
+            mark_inside(grid, points.reshape(-1, 2))
+    return grid
 
 ANSWER = """
 ##....#....#
@@ -132,50 +102,10 @@ ANSWER = """
 ANSWER = ANSWER.strip().splitlines()
 
 def solve(rows, extend):
-    "Solution to part 1. 14 for the test input."
-    w, h = len(rows[0]), len(rows)
-    img = np.zeros((h, w), dtype=int)
-    sym_num = {}
-    current = 0
-    for y in range(h):
-        for x in range(w):
-            sym = rows[y][x]
-            if sym.isalpha() or sym.isdigit():
-                if sym not in sym_num:
-                    current += 1
-                    sym_num[sym] = current
-                num = sym_num[sym]
-                img[y, x] = num
-    if VERBOSE:
-        print(f"img={img.shape}\n{img}")
-        print(f"sym_num={sym_num}")
-    vals = sorted(sym_num.values())
-    originals = {}
-    for k in vals:
-        originals[k] = {(y, x) for y in range(h) for x in range(w) if img[y, x] == k}
-    exclusions = {}
-    for k in vals:
-        exclusions[k] = {x for l, v in originals.items() if l != k for x in v}
-    all_antinodes = set()
-    for k in vals:
-        img_k = (img == k).astype(int)
-        antinodes = antinodes_(img_k, extend)
-        valids = antinodes - exclusions[k]
-        if VERBOSE: print(f"Antinodes {k}: {len(antinodes)}->{len(valids)} {antinodes} -> {valids}")
-        all_antinodes.update(antinodes)
-        for y, x in antinodes:
-            img_k[y,x] = MARK
-        if VERBOSE: print(f"img_{k}=\n{img_k}")
-    for y, x in all_antinodes:
-        img[y, x] = MARK
-    if VERBOSE: print(f"img=\n{img}")
-
-    for i, row in enumerate(img):
-        n = sum(row!=0)
-        if VERBOSE:  print(f"{i:2}: {n} {row}")
-    if extend:
-        return sum([sum(row!=0) for row in img])
-    return len(all_antinodes)
+    "Returns the number of antinodes of the antennas in `rows`."
+    grid = antinodes_(antenna_groups_(rows), (len(rows), len(rows[0])), extend)
+    if VERBOSE: print("\n".join("".join("#" if v else "." for v in row) for row in grid))
+    return int(grid.sum())
 
 def part1(rows):
     "Solution to part 1. 14 for the test input."
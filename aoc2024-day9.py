@@ -67,222 +67,152 @@
 
 """
 import time
-from common import parse_args, read_text, MyNamespace as ns
+import heapq
+import random
+from common import parse_args, read_text
 
 DEBUG = False
 VERBOSE = False
-SHOW_PROGRESS = False
 
 def numbers_(text):
     "Extracts the digits in `text` and returns them as a list of integers."
     return [int(c) for c in text if c.isdigit()]
 
-def blocks_(numbers):
+def span_checksum_(start, length, file_id):
+    "Returns the checksum of `length` blocks of `file_id` from `start`: file_id * sum(start..start+length-1)."
+    return file_id * (start * length + length * (length - 1) // 2)
+
+def compact_blocks_(numbers):
+    """ Move file blocks one at a time from the end of the disk to the leftmost free block and
+        return the checksum of the compacted disk.
+        `left` walks the files from the start and `right` walks them from the end with `remaining`
+        blocks of file `right` still to move. Each file stays in place and its following gap is
+        filled from the right, one span per file so the checksum is a sum of `span_checksum_`s.
+    """
+    files, gaps = numbers[0::2], numbers[1::2]
+    left, right = 0, len(files) - 1
+    remaining = files[right]
+    pos = 0
+    checksum = 0
+    while left <= right:
+        if left == right:
+            checksum += span_checksum_(pos, remaining, right)
+            break
+        checksum += span_checksum_(pos, files[left], left)
+        pos += files[left]
+        gap = gaps[left]
+        while gap and left < right:
+            n = min(gap, remaining)
+            checksum += span_checksum_(pos, n, right)
+            pos += n
+            gap -= n
+            remaining -= n
+            if remaining == 0:
+                right -= 1
+                remaining = files[right] if right > left else 0
+        left += 1
+    return checksum
+
+def gap_spans_(numbers):
+    """ Returns the files as (start, length) pairs and the free spans as (start, size) pairs of the
+        disk map `numbers`. Gaps on either side of a 0-length file are one span on the disk, so they
+        are merged and a span can be longer than 9 blocks.
     """
-    Returns `numbers` as a list of blocks, where each block is either a file ID (>= 0) or a
-    free space indicator (-1).
-    `numbers` is a list of integers where even-indexed elements represent the number of times to
-    repeat the file ID (calculated as the index divided by 2), and odd-indexed elements represent
-    the number of times to repeat the free space indicator (-1).
+    files, spans = [], []
+    pos = 0
+    for i, n in enumerate(numbers):
+        if i % 2 == 0: files.append((pos, n))
+        elif spans and sum(spans[-1]) == pos: spans[-1] = (spans[-1][0], spans[-1][1] + n)
+        elif n: spans.append((pos, n))
+        pos += n
+    return files, spans
+
+def compact_files_(numbers):
+    """ Move whole files, highest file ID first, to the leftmost gap to their left that fits them and
+        return the checksum of the compacted disk.
+        gaps[size] is a min-heap of the start positions of the gaps of `size` blocks, so the leftmost
+        fitting gap is the smallest heap top over sizes length..longest gap. The unused end of a gap
+        is pushed to the heap for its new size. Gaps left by moved files are never needed because
+        the files still to move are to their left.
     """
+    files, spans = gap_spans_(numbers)
+    gaps = [[] for _ in range(max((n for _, n in spans), default=0) + 1)]
+    for pos, n in spans: gaps[n].append(pos)  # Ascending positions are already heaps.
+
+    checksum = 0
+    for file_id in range(len(files) - 1, -1, -1):
+        start, length = files[file_id]
+        best_size = 0
+        for size in range(max(length, 1), len(gaps)):
+            if gaps[size] and gaps[size][0] < start:
+                start, best_size = gaps[size][0], size
+        if best_size:
+            heapq.heappop(gaps[best_size])
+            if best_size > length: heapq.heappush(gaps[best_size - length], start + length)
+        checksum += span_checksum_(start, length, file_id)
+    return checksum
+
+def compact_files_blocks_(numbers):
+    "Returns the checksum from `compact_files_` by moving the files block by block. For testing."
     blocks = []
-    for i, v in enumerate(numbers):
-        file_id = i // 2 if i % 2 == 0 else -1
-        for _ in range(v): blocks.append(file_id)
-    return blocks
-
-def cluster_(n, v):
-    "Create a cluster object with `n` blocks of value `v`."
-    return ns(n=n, v=v)
-
-def run_(clist, gap):
-    "Create a run object with a list of clusters and a gap."
-    return ns(clist=clist.copy(), gap=gap)
-
-def run_len(run):
-    "Return the length of a run."
-    return sum(c.n for c in run.clist) + run.gap
-
-def show(blocks):
-    "Return a string representation of `blocks`, '.' for -1 and the block value otherwise"
-    return "".join(str(b) if b != -1 else "." for b in blocks)
-
-def checksum_(blocks):
-    "Calculate and return the checksum of `blocks`."
+    for i, n in enumerate(numbers): blocks.extend([i // 2 if i % 2 == 0 else -1] * n)
+    for file_id in range(len(numbers[0::2]) - 1, -1, -1):
+        if file_id not in blocks: continue
+        start, length = blocks.index(file_id), blocks.count(file_id)
+        run = 0
+        for i in range(start):
+            run = run + 1 if blocks[i] == -1 else 0
+            if run == length:
+                blocks[i + 1 - length:i + 1] = [file_id] * length
+                blocks[start:start + length] = [-1] * length
+                break
     return sum(i * v for i, v in enumerate(blocks) if v != -1)
 
-def run_list_(blocks):
-    "Scan `blocks`, a list of blocks return them as a list of runs."
-    run_list = []
-    clist = []
-    gap_g = [0]
-
-    def add_run(n, v, last=False):
-        "Add a run of n blocks with value v to the clusters or gaps list."
-        gap = gap_g[0]
-        if v != -1: clist.append(cluster_(n, v))
-        else: gap = n
-        if v == -1 or last:
-            run = run_(clist, gap)
-            run_list.append(run)
-            clist.clear()
-            gap = 0
-        gap_g[0] = gap
-
-    n, v0 = 1, blocks[0]
-    for i, v in enumerate(blocks[1:]):
-        if VERBOSE:
-            print(f"{i+1:4}: {v:2}, in_gap: {v0 == -1}, n: {n}, v0: {v0} [{clist},{gap_g[0]}]", end="")
-        if v != v0:
-            add_run(n, v0)
-            n, v0 = 1, v
-            if VERBOSE: print(f" -> {run_list}")
-        else:
-            n += 1
-            if VERBOSE: print("")
-    if n > 0:
-        add_run(n, v0, True)
-
-    return run_list
-
-class RunEncoding:
-    """
-    RunEncoding class for processing and manipulating run-length encoded blocks.
-
-    Attributes:
-        run_list (list): A list of runs representing clusters and gaps in the blocks.
-   """
-    def __init__(self, blocks):
-        """
-        Initializes self.run_list with a list of blocks
-        """
-        if VERBOSE:
-            print(f"RunList:- {show(blocks)}")
-        run_list = run_list_(blocks)
-        self.run_list = run_list
-        blocks2 = self.blocks_()
-        if VERBOSE:
-            print(f"run_list: {run_list}")
-            print(f"RunList:- {show(blocks)}")
-            print(f"RunList:+ {show(blocks2)}")
-        assert len(blocks) == len(blocks2), (len(blocks), len(blocks2))
-        for i, (b1, b2) in enumerate(zip(blocks, blocks2)):
-            assert b1 == b2, (i, [b1, b2])
-
-    def __str__(self):
-        return show(self.blocks_())
-
-    def blocks_(self):
-        "Unpack the runs into a list of blocks."
-        blocks = []
-        for run in self.run_list:
-            for c in run.clist:
-                for _ in range(c.n):
-                    blocks.append(c.v)
-            for _ in range(run.gap):
-                blocks.append(-1)
-        return blocks
-
-    def insert_cluster(self, i, c):
-        """
-        Inserts cluster `c` into `self.run_list`[`i`] and updates the `clusters` and `gaps` lists.
-
-        Parameters:
-        i: The index of the run where the cluster should be inserted.
-        c: The cluster to be inserted.
-
-        Modifies:
-        The function modifies the `self.run_list`[`i`] run by adding the cluster `c` to its clist
-        and reducing the gap by `c.n`.
-        """
-        run = self.run_list[i]
-        run0 = run_(run.clist.copy(), run.gap)
-        assert c.n <= run.gap, (c.n, run.gap)
-        run.gap -= c.n
-        run.clist.append(c)
-        len0 = run_len(run0)
-        len1 = run_len(run)
-        assert len1 == len0, ((len0,run0), (len1, run))
-        self.run_list[i] = run
-
-    def defragment_run(self, n):
-        """
-        Defragments the run at index `n` by attempting to insert its clusters into previous runs
-        if there is enough gap to accommodate them. Updates the cluster list of the run at index `n`
-        by marking the moved clusters.
-        """
-        run0 = self.run_list[n]
-        removed = []
-        for j, c in enumerate(reversed(run0.clist)):
-            for i, run in enumerate(self.run_list[:n]):
-                if run.gap >= c.n:
-                    self.insert_cluster(i, c)
-                    removed.append(len(run0.clist) - 1- j)
-                    break
-        run0.clist = [cluster_(c.n, -1) if j in removed else c for j, c in enumerate(run0.clist)]
-        self.run_list[n] = run0
-        assert isinstance(self.run_list[0], ns), type(self.run_list[0])
-
-def part1(blocks):
+def test1():
+    "Test `compact_files_` against the block by block compaction, including 0-length files."
+    numbers = numbers_("2333133121414131402")
+    checksum = compact_files_(numbers)
+    assert checksum == 2858, f"Expected 2858, got {checksum}"
+    checksum = compact_files_([1, 1, 0, 1, 2])
+    assert checksum == 6, f"Expected 6 with a 0-length file between gaps, got {checksum}"
+    rng = random.Random(9)
+    for _ in range(1000):
+        numbers = [rng.choice([0, 0, 1, 2, 3, 9]) for _ in range(rng.randint(1, 30))]
+        expected = compact_files_blocks_(numbers)
+        checksum = compact_files_(numbers)
+        assert checksum == expected, f"{numbers}: Expected {expected}, got {checksum}"
+    print("Test passed: 1000 random disk maps")
+
+def part1(numbers):
     "Solution to part 1. 1928 for the test input. 6258319840548"
-    i, n = 0, len(blocks) - 1
-    while i < n:
-        if blocks[i] != -1:
-            i += 1
-            continue
-        if blocks[n] == -1:
-            n -= 1
-            continue
-        blocks[i], blocks[n] = blocks[n], -1
-        i += 1
-        n -= 1
-
-    checksum = checksum_(blocks)
-
+    checksum = compact_blocks_(numbers)
     print(f"Part 1: {checksum}")
 
-def part2(blocks):
+def part2(numbers):
     "Solution to part 2. 2858 for the test input. 6286182965311"
-    renc = RunEncoding(blocks)
-
-    if SHOW_PROGRESS:
-        print(f"RunEncoding:- {len(renc.run_list)} runs")
-        state0 = str(renc)
-        state00 = state0
-        print(f"RunList:- {state00}")
-        for i, run in enumerate(renc.run_list):
-            print(f"{i:4}: {run_len(run):2} {run.clist} {run.gap:2}")
-    for n in range(len(renc.run_list) - 1, -1, -1):
-        renc.defragment_run(n)
-        if SHOW_PROGRESS:
-            state = str(renc)
-            if state != state0:
-                state0 = state
-                print(f"RunList:{n} {state}")
-                for i, run in enumerate(renc.run_list):
-                    print(f"{i:4}: {run_len(run):2} {run.clist} {run.gap:2}")
-
-    if SHOW_PROGRESS: print(f"RunList:- {state00}")
-    blocks = renc.blocks_()
-    checksum = checksum_(blocks)
+    checksum = compact_files_(numbers)
     print(f"Part 2: {checksum}")
 
 args = parse_args("Advent of Code 2024 - Day 9", "problems/aoc2024-day9-input-test.txt")
+
+if args.testing:
+    test1()
+    exit()
+
 text = read_text(args.input)
 numbers = numbers_(text)
-blocks = blocks_(numbers)
 
-if DEBUG: blocks = blocks[:100]
+if DEBUG: numbers = numbers[:100]
 
 if VERBOSE:
     print(f"{len(numbers)} numbers")
-    print(f"{len(blocks)} blocks")
+    print(f"{sum(numbers)} blocks")
 
 t0 = time.time()
-part1(blocks.copy())
+part1(numbers)
 t1 = time.time() - t0
 t0 = time.time()
-part2(blocks)
+part2(numbers)
 t2 = time.time() - t0
 print(f"Part 1: {t1:.1f} sec")
 print(f"Part 2: {t2:.1f} sec")
@@ -3,6 +3,7 @@
 """
 import re
 import argparse
+import multiprocessing as mp
 from types import SimpleNamespace
 
 concat = "".join
@@ -131,3 +132,20 @@ def number_(text):
     """Return the number formed by concatenating all digits in `text`."""
     if not any(char.isdigit() for char in text): return 0
     return int(concat(filter(str.isdigit, text)))
+
+# Process pools.
+# The solutions are scripts without a main guard, so a worker process that is spawned rather than
+# forked would re-run the whole script. Pools are therefore only created with the fork start method,
+# and where fork is unavailable the work is done in the main process.
+
+def pool_processes_(num_items, min_items, processes=None):
+    """ Returns the number of worker processes to use for `num_items` items, 1 meaning the main
+        process. `processes` defaults to all cores. Fewer than `min_items` items aren't worth a pool.
+    """
+    processes = processes or mp.cpu_count()
+    if num_items < min_items or "fork" not in mp.get_all_start_methods(): return 1
+    return processes
+
+def fork_pool(processes, initializer=None, initargs=()):
+    "Returns a pool of `processes` forked worker processes that each run `initializer(*initargs)`."
+    return mp.get_context("fork").Pool(processes, initializer=initializer, initargs=initargs)